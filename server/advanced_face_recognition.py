@@ -2,16 +2,100 @@ import cv2
 import numpy as np
 import face_recognition
 import os
-import pandas as pd
+import json
 from datetime import datetime
 import pickle
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from attendance_db import AttendanceDatabase
+
+try:
+    import numba
+except ImportError:  # Optional: JIT-compiled distance kernel
+    numba = None
+
+try:
+    import faiss
+except ImportError:  # Optional: approximate nearest-neighbour index for large galleries
+    faiss = None
+
+# Galleries at least this large are searched with a FAISS HNSW index when faiss is installed
+FAISS_MIN_GALLERY = 1000
+# Neighbours per node in the HNSW graph
+FAISS_HNSW_NEIGHBORS = 32
+# Run face detection and encoding on every Nth camera frame, track boxes in between
+DETECTION_INTERVAL = 3
+# KCF trackers live in opencv-contrib-python; without them every frame is detected
+HAS_KCF_TRACKER = hasattr(cv2, 'legacy') and hasattr(cv2.legacy, 'TrackerKCF_create')
+# Frames per batch when detecting with dlib's CNN model (GPU builds of dlib)
+CNN_BATCH_SIZE = 8
+# Registration photos are downscaled so their longest side is at most this many pixels
+MAX_REGISTRATION_IMAGE_SIZE = 1024
+# Capture resolution requested from the webcam; every per-frame step scales with it
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+
+
+def _encode_image(image_path):
+    """Return the encoding of the first face in an image, or None if there is no face
+    
+    Module-level so ProcessPoolExecutor workers can pickle it.
+    """
+    # cv2.imread decodes JPEGs with libjpeg-turbo, faster than face_recognition's PIL loader
+    bgr_image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if bgr_image is None:
+        raise ValueError(f"Could not read image: {image_path}")
+    
+    # HOG detection cost grows with pixel count; phone photos gain nothing above this size
+    height, width = bgr_image.shape[:2]
+    if max(height, width) > MAX_REGISTRATION_IMAGE_SIZE:
+        scale = MAX_REGISTRATION_IMAGE_SIZE / max(height, width)
+        bgr_image = cv2.resize(bgr_image, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    
+    image = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2RGB)
+    face_encodings = face_recognition.face_encodings(image)
+    return face_encodings[0] if face_encodings else None
+
+
+if numba is not None:
+    @numba.njit(parallel=True, fastmath=True, cache=True)
+    def _best_match(known, probe):
+        """Euclidean distance from probe to every known row, fused with the argmin"""
+        num_known = known.shape[0]
+        distances = np.empty(num_known, dtype=np.float32)
+        for i in numba.prange(num_known):
+            total = np.float32(0.0)
+            for j in range(known.shape[1]):
+                diff = known[i, j] - probe[j]
+                total += diff * diff
+            distances[i] = np.sqrt(total)
+        best_index = np.argmin(distances)
+        return best_index, distances[best_index]
+    
+    @numba.njit(parallel=True, cache=True)
+    def _downscale_bgr_to_rgb(frame, out, stride):
+        """Nearest-neighbour downscale and BGR->RGB swap in a single pass over the frame"""
+        for y in numba.prange(out.shape[0]):
+            source_y = y * stride
+            for x in range(out.shape[1]):
+                source_x = x * stride
+                out[y, x, 0] = frame[source_y, source_x, 2]
+                out[y, x, 1] = frame[source_y, source_x, 1]
+                out[y, x, 2] = frame[source_y, source_x, 0]
+
 
 class AdvancedFaceRecognition:
-    def __init__(self):
+    def __init__(self, use_cnn_detection=False):
+        # CNN detection is far more accurate but only practical with a CUDA build of dlib
+        self.use_cnn_detection = use_cnn_detection
         self.students_csv = "data/students.csv"
         self.attendance_csv = "data/attendance.csv"
+        self.database_file = "data/attendance.db"
         self.training_folder = "training_images"
-        self.encodings_file = "models/face_encodings.pkl"
+        self.encodings_file = "models/face_encodings.npy"
+        self.encodings_meta_file = "models/face_encodings.json"
+        self.legacy_encodings_file = "models/face_encodings.pkl"
         
         # Create necessary directories
         os.makedirs("data", exist_ok=True)
@@ -22,45 +106,49 @@ class AdvancedFaceRecognition:
         self.known_face_encodings = []
         self.known_face_names = []
         self.known_face_ids = []
+        self._rebuild_known_matrix()
+        
+        # Index over the CSV files, which stay shared with the API and CLI systems
+        self.db = AttendanceDatabase(self.database_file, self.students_csv, self.attendance_csv)
         
-        # Initialize CSV files
-        self.init_csv_files()
+        # Attendance from the camera loop is written by a background thread
+        self._attendance_queue = queue.Queue()
+        threading.Thread(target=self._attendance_writer, daemon=True).start()
         
         # Load existing encodings if available
         self.load_encodings()
-    
-    def init_csv_files(self):
-        """Initialize CSV files with headers if they don't exist"""
-        if not os.path.exists(self.students_csv):
-            df = pd.DataFrame(columns=['student_id', 'name', 'email', 'registration_date'])
-            df.to_csv(self.students_csv, index=False)
-            
-        if not os.path.exists(self.attendance_csv):
-            df = pd.DataFrame(columns=['student_id', 'name', 'date', 'time', 'status'])
-            df.to_csv(self.attendance_csv, index=False)
+        
+        # Webcam is opened on first use and kept open between sessions
+        self._cap = None
+        
+        # Detection buffers, allocated once the camera frame size is known
+        self._small_frame = None
+        self._rgb_small_frames = []
+        
+        # Load dlib models now instead of stalling the first camera frame
+        self._warm_up_models()
     
     def register_student_with_image(self, student_id, name, email, image_path):
         """Register a student with a single image"""
         try:
             # Check if student already exists
-            students_df = pd.read_csv(self.students_csv)
-            if student_id in students_df['student_id'].values:
+            if self.db.student_exists(student_id):
                 return {"success": False, "message": "Student ID already exists"}
             
-            # Load and encode the face
-            image = face_recognition.load_image_file(image_path)
-            face_encodings = face_recognition.face_encodings(image)
+            # Load and encode the first face found
+            face_encoding = _encode_image(image_path)
             
-            if len(face_encodings) == 0:
+            if face_encoding is None:
                 return {"success": False, "message": "No face found in the image"}
             
-            # Use the first face found
-            face_encoding = face_encodings[0]
-            
             # Create student folder and save encoding
             student_folder = os.path.join(self.training_folder, str(student_id))
             os.makedirs(student_folder, exist_ok=True)
             
+            # Add student to the students CSV; another process may have taken the ID meanwhile
+            if not self.db.add_student(student_id, name, email, datetime.now().strftime('%Y-%m-%d %H:%M:%S')):
+                return {"success": False, "message": "Student ID already exists"}
+            
             # Save the original image
             import shutil
             shutil.copy2(image_path, os.path.join(student_folder, f"{student_id}_original.jpg"))
@@ -69,162 +157,408 @@ class AdvancedFaceRecognition:
             self.known_face_encodings.append(face_encoding)
             self.known_face_names.append(name)
             self.known_face_ids.append(student_id)
+            self._rebuild_known_matrix()
             
             # Save encodings to file
             self.save_encodings()
             
-            # Add student to CSV
-            new_student = {
-                'student_id': student_id,
-                'name': name,
-                'email': email,
-                'registration_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            students_df = pd.concat([students_df, pd.DataFrame([new_student])], ignore_index=True)
-            students_df.to_csv(self.students_csv, index=False)
-            
             return {"success": True, "message": f"Student {name} registered successfully!"}
             
         except Exception as e:
             return {"success": False, "message": f"Error registering student: {str(e)}"}
     
+    def register_students_bulk(self, students, max_workers=None):
+        """Register many students at once, encoding their images in parallel
+        
+        students is a list of (student_id, name, email, image_path) tuples. Images
+        are encoded across worker processes; encodings and the database are
+        updated once in this process after all workers finish.
+        """
+        results = []
+        pending = []
+        seen_ids = set()
+        registered_ids = self.db.get_student_ids()
+        for student_id, name, email, image_path in students:
+            if student_id in seen_ids or student_id in registered_ids:
+                results.append({"student_id": student_id, "success": False, "message": "Student ID already exists"})
+            elif not os.path.exists(image_path):
+                results.append({"student_id": student_id, "success": False, "message": "Image file not found"})
+            else:
+                pending.append((student_id, name, email, image_path))
+            seen_ids.add(student_id)
+        
+        if pending:
+            with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+                futures = [executor.submit(_encode_image, item[3]) for item in pending]
+                
+                import shutil
+                registration_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                for (student_id, name, email, image_path), future in zip(pending, futures):
+                    try:
+                        face_encoding = future.result()
+                    except Exception as e:
+                        results.append({"student_id": student_id, "success": False, "message": f"Error encoding image: {str(e)}"})
+                        continue
+                    
+                    if face_encoding is None:
+                        results.append({"student_id": student_id, "success": False, "message": "No face found in the image"})
+                        continue
+                    
+                    if not self.db.add_student(student_id, name, email, registration_date):
+                        results.append({"student_id": student_id, "success": False, "message": "Student ID already exists"})
+                        continue
+                    
+                    student_folder = os.path.join(self.training_folder, str(student_id))
+                    os.makedirs(student_folder, exist_ok=True)
+                    shutil.copy2(image_path, os.path.join(student_folder, f"{student_id}_original.jpg"))
+                    
+                    self.known_face_encodings.append(face_encoding)
+                    self.known_face_names.append(name)
+                    self.known_face_ids.append(student_id)
+                    results.append({"student_id": student_id, "success": True, "message": f"Student {name} registered successfully!"})
+        
+        registered = sum(1 for result in results if result["success"])
+        if registered:
+            self._rebuild_known_matrix()
+            self.save_encodings()
+        
+        return {
+            "success": registered > 0,
+            "message": f"Registered {registered} of {len(students)} students",
+            "results": results
+        }
+    
     def save_encodings(self):
-        """Save face encodings to pickle file"""
+        """Save face encodings as a float32 .npy matrix plus a JSON file of ids and names"""
         try:
-            encodings_data = {
-                'encodings': self.known_face_encodings,
-                'names': self.known_face_names,
-                'ids': self.known_face_ids
-            }
-            with open(self.encodings_file, 'wb') as f:
-                pickle.dump(encodings_data, f)
+            # Write to temporary files first so a crash never leaves a half-written pair
+            matrix_tmp = self.encodings_file + ".tmp"
+            meta_tmp = self.encodings_meta_file + ".tmp"
+            with open(matrix_tmp, 'wb') as f:
+                np.save(f, self._known_matrix)
+            with open(meta_tmp, 'w', encoding='utf-8') as f:
+                json.dump({'ids': [int(i) for i in self.known_face_ids], 'names': self.known_face_names}, f)
+            os.replace(matrix_tmp, self.encodings_file)
+            os.replace(meta_tmp, self.encodings_meta_file)
         except Exception as e:
             print(f"Error saving encodings: {str(e)}")
     
     def load_encodings(self):
-        """Load face encodings from pickle file"""
+        """Load face encodings from the .npy matrix and its JSON metadata"""
         try:
-            if os.path.exists(self.encodings_file):
-                with open(self.encodings_file, 'rb') as f:
+            if os.path.exists(self.encodings_file) and os.path.exists(self.encodings_meta_file):
+                with open(self.encodings_meta_file, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                self.known_face_ids = meta['ids']
+                self.known_face_names = meta['names']
+                # Read into memory, not mapped: Windows refuses the os.replace in save_encodings on a mapped file
+                self._rebuild_known_matrix(np.load(self.encodings_file))
+                print(f"Loaded {len(self.known_face_encodings)} face encodings")
+            elif os.path.exists(self.legacy_encodings_file):
+                # One-time migration from the old pickle format
+                with open(self.legacy_encodings_file, 'rb') as f:
                     encodings_data = pickle.load(f)
                     self.known_face_encodings = encodings_data['encodings']
                     self.known_face_names = encodings_data['names']
                     self.known_face_ids = encodings_data['ids']
-                print(f"Loaded {len(self.known_face_encodings)} face encodings")
+                self._rebuild_known_matrix()
+                self.save_encodings()
+                print(f"Migrated {len(self.known_face_encodings)} face encodings from {self.legacy_encodings_file}")
         except Exception as e:
             print(f"Error loading encodings: {str(e)}")
     
+    def _rebuild_known_matrix(self, matrix=None):
+        """Stack known encodings into one contiguous (N, 128) float32 matrix
+        
+        A loaded matrix can be passed in directly. known_face_encodings is then
+        reset to row views of the matrix, so no per-face arrays are kept alive.
+        """
+        if matrix is None:
+            if self.known_face_encodings:
+                matrix = np.vstack(self.known_face_encodings)
+            else:
+                matrix = np.empty((0, 128), dtype=np.float32)
+        self._known_matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.known_face_encodings = list(self._known_matrix)
+        
+        # Squared norms of the known encodings, reused by every GEMM match
+        self._known_sq = np.einsum('ij,ij->i', self._known_matrix, self._known_matrix)
+        
+        # HNSW graph over the raw encodings; L2 metric keeps the 0.6 tolerance meaningful
+        self._faiss_index = None
+        if faiss is not None and len(self._known_matrix) >= FAISS_MIN_GALLERY:
+            self._faiss_index = faiss.IndexHNSWFlat(self._known_matrix.shape[1], FAISS_HNSW_NEIGHBORS)
+            self._faiss_index.add(self._known_matrix)
+    
+    def _match_encodings(self, face_encodings):
+        """Match all probe encodings against all known faces in one vectorized pass
+        
+        Returns the index of the closest known face and its Euclidean distance
+        for every probe, in the same order as face_encodings.
+        """
+        probes = np.asarray(face_encodings, dtype=np.float32).reshape(-1, self._known_matrix.shape[1])
+        if self._faiss_index is not None:
+            # FAISS reports squared L2 distances
+            squared_distances, indices = self._faiss_index.search(probes, 1)
+            return indices[:, 0], np.sqrt(squared_distances[:, 0])
+        
+        if numba is not None and len(probes) == 1:
+            # One probe is a single fused scan; several amortise better as one BLAS product
+            best_index, best_distance = _best_match(self._known_matrix, probes[0])
+            return np.array([best_index], dtype=np.int64), np.array([best_distance], dtype=np.float32)
+        
+        # ||p - k||^2 = ||p||^2 + ||k||^2 - 2 p.k turns the scan into one BLAS matrix product
+        dots = probes @ self._known_matrix.T
+        probe_sq = np.einsum('ij,ij->i', probes, probes)
+        squared_distances = probe_sq[:, None] + self._known_sq[None, :] - 2.0 * dots
+        best_indices = squared_distances.argmin(axis=1)
+        best_squared = squared_distances[np.arange(len(probes)), best_indices]
+        # Rounding can push a near-zero distance slightly negative
+        best_distances = np.sqrt(np.maximum(best_squared, 0.0))
+        return best_indices, best_distances
+    
+    def _warm_up_models(self):
+        """Run one dummy detection and encoding pass so dlib loads its models up front"""
+        blank = np.zeros((100, 100, 3), dtype=np.uint8)
+        face_recognition.face_encodings(blank, [(0, 99, 99, 0)])
+        if self.use_cnn_detection:
+            face_recognition.batch_face_locations([blank], batch_size=1)
+    
+    def _get_camera(self):
+        """Return the shared webcam, opening and configuring it only if it is not open yet"""
+        if self._cap is None or not self._cap.isOpened():
+            # MSMF ignores the property requests below, so use DirectShow on Windows
+            self._cap = cv2.VideoCapture(0, cv2.CAP_DSHOW) if os.name == 'nt' else cv2.VideoCapture(0)
+            self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
+            self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
+            self._cap.set(cv2.CAP_PROP_FPS, 30)
+        return self._cap
+    
+    def release_camera(self):
+        """Release the shared webcam"""
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+    
+    def _start_capture(self, cap):
+        """Read camera frames on a background thread, keeping only the newest one"""
+        self._frame_queue = queue.Queue(maxsize=1)
+        self._capturing = True
+        self._capture_thread = threading.Thread(target=self._capture_loop, args=(cap,), daemon=True)
+        self._capture_thread.start()
+    
+    def _capture_loop(self, cap):
+        """Producer loop: replace any unread frame so the consumer never sees a stale one"""
+        while self._capturing:
+            ret, frame = cap.read()
+            if not ret:
+                frame = None  # Tells the consumer the camera stopped delivering
+            try:
+                self._frame_queue.put_nowait(frame)
+            except queue.Full:
+                try:
+                    self._frame_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self._frame_queue.put_nowait(frame)
+            if frame is None:
+                break
+    
+    def _stop_capture(self):
+        """Stop the capture thread before the camera is released"""
+        self._capturing = False
+        self._capture_thread.join(timeout=1.0)
+    
+    def _prepare_detection_frame(self, frame, slot=0):
+        """Downscale a BGR camera frame to the quarter-size RGB image used for detection
+        
+        Output goes into preallocated buffers instead of fresh arrays every frame.
+        Each CNN batch position gets its own RGB buffer (slot) because a whole
+        batch is detected before any of its frames are encoded.
+        """
+        height, width = frame.shape[:2]
+        small_shape = (height // 4, width // 4, 3)
+        if self._small_frame is None or self._small_frame.shape != small_shape:
+            self._small_frame = np.empty(small_shape, dtype=np.uint8)
+            self._rgb_small_frames = [np.empty(small_shape, dtype=np.uint8) for _ in range(CNN_BATCH_SIZE)]
+        
+        rgb_small_frame = self._rgb_small_frames[slot]
+        if numba is not None:
+            # Reads each sampled pixel once and writes RGB directly, no intermediate image
+            _downscale_bgr_to_rgb(frame, rgb_small_frame, 4)
+        else:
+            cv2.resize(frame, (small_shape[1], small_shape[0]), dst=self._small_frame)
+            cv2.cvtColor(self._small_frame, cv2.COLOR_BGR2RGB, dst=rgb_small_frame)
+        return rgb_small_frame
+    
+    def _recognize_faces(self, rgb_small_frame, face_locations, attendance_marked):
+        """Encode and match detected faces, marking attendance for confident matches
+        
+        Returns (box, label, color) for each face, with boxes as full-frame
+        (left, top, right, bottom) coordinates.
+        """
+        face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+        
+        # Match every detected face against every known face at once
+        best_indices, best_distances = [], []
+        if face_encodings:
+            best_indices, best_distances = self._match_encodings(face_encodings)
+        
+        # Scale all face locations back up in one array operation
+        locations = (np.asarray(face_locations, dtype=np.int32).reshape(-1, 4) * 4).tolist()
+        
+        faces = []
+        for (top, right, bottom, left), best_match_index, best_distance in zip(locations, best_indices, best_distances):
+            if best_distance < 0.6:
+                name = self.known_face_names[best_match_index]
+                student_id = self.known_face_ids[best_match_index]
+                confidence = round((1 - best_distance) * 100, 1)
+                faces.append(((left, top, right, bottom), f"{name} ({confidence}%)", (0, 255, 0)))
+                
+                # Auto-mark attendance if confidence is high enough; the write
+                # happens on the writer thread so the frame loop never waits on it
+                if confidence > 75 and student_id not in attendance_marked:
+                    attendance_marked.add(student_id)
+                    self._attendance_queue.put((student_id, name, datetime.now()))
+            else:
+                # Unknown face
+                faces.append(((left, top, right, bottom), "Unknown", (0, 0, 255)))
+        
+        return faces
+    
+    def _start_tracks(self, frame, faces):
+        """Start a KCF tracker per face; call before anything is drawn on the frame"""
+        tracks = []
+        for (left, top, right, bottom), label, color in faces:
+            tracker = cv2.legacy.TrackerKCF_create()
+            tracker.init(frame, (left, top, right - left, bottom - top))
+            tracks.append((tracker, label, color))
+        return tracks
+    
+    def _update_tracks(self, frame, tracks):
+        """Follow tracked faces into a new frame, dropping any the trackers lost"""
+        faces = []
+        active_tracks = []
+        for tracker, label, color in tracks:
+            ok, (x, y, w, h) = tracker.update(frame)
+            if ok:
+                x, y, w, h = int(x), int(y), int(w), int(h)
+                faces.append(((x, y, x + w, y + h), label, color))
+                active_tracks.append((tracker, label, color))
+        return faces, active_tracks
+    
     def mark_attendance_from_camera(self):
         """Mark attendance using live camera feed"""
         try:
             if len(self.known_face_encodings) == 0:
                 return {"success": False, "message": "No registered students found. Please register students first."}
             
-            cap = cv2.VideoCapture(0)
+            cap = self._get_camera()
             attendance_marked = set()  # To track which students have been marked
+            num_students = len(set(self.known_face_ids))
+            frame_index = 0
+            tracks = []  # (tracker, label, color) for faces found by the last detection
+            batch_size = CNN_BATCH_SIZE if self.use_cnn_detection else 1
+            camera_open = True
+            quit_requested = False
             
             print("Face Recognition for Attendance - Press 'q' to quit")
             
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                # Resize frame for faster processing
-                small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-                rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+            # Camera reads run on their own thread so they overlap with recognition
+            self._start_capture(cap)
+            
+            while camera_open and not quit_requested:
+                # CNN mode gathers several frames so detection runs as one GPU batch
+                frames = []
+                while len(frames) < batch_size:
+                    try:
+                        frame = self._frame_queue.get(timeout=5.0)
+                    except queue.Empty:
+                        frame = None
+                    if frame is None:
+                        camera_open = False
+                        break
+                    frames.append(frame)
                 
-                # Find faces in the frame
-                face_locations = face_recognition.face_locations(rgb_small_frame)
-                face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations)
+                if self.use_cnn_detection and frames:
+                    rgb_small_frames = [self._prepare_detection_frame(frame, slot) for slot, frame in enumerate(frames)]
+                    batch_locations = face_recognition.batch_face_locations(rgb_small_frames, batch_size=len(frames))
                 
-                for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                    # Scale back up face locations
-                    top *= 4
-                    right *= 4
-                    bottom *= 4
-                    left *= 4
-                    
-                    # Check if face matches any known face
-                    matches = face_recognition.compare_faces(self.known_face_encodings, face_encoding, tolerance=0.6)
-                    face_distances = face_recognition.face_distance(self.known_face_encodings, face_encoding)
+                for i, frame in enumerate(frames):
+                    if self.use_cnn_detection:
+                        faces = self._recognize_faces(rgb_small_frames[i], batch_locations[i], attendance_marked)
+                    elif frame_index % DETECTION_INTERVAL == 0 or not HAS_KCF_TRACKER:
+                        rgb_small_frame = self._prepare_detection_frame(frame)
+                        face_locations = face_recognition.face_locations(rgb_small_frame)
+                        faces = self._recognize_faces(rgb_small_frame, face_locations, attendance_marked)
+                        if HAS_KCF_TRACKER:
+                            tracks = self._start_tracks(frame, faces)
+                    else:
+                        # Between detections just follow the boxes
+                        faces, tracks = self._update_tracks(frame, tracks)
                     
-                    best_match_index = np.argmin(face_distances)
+                    frame_index += 1
                     
-                    if matches[best_match_index] and face_distances[best_match_index] < 0.6:
-                        name = self.known_face_names[best_match_index]
-                        student_id = self.known_face_ids[best_match_index]
-                        confidence = round((1 - face_distances[best_match_index]) * 100, 1)
-                        
+                    for (left, top, right, bottom), label, color in faces:
                         # Draw rectangle and label
-                        cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                        cv2.rectangle(frame, (left, bottom - 35), (right, bottom), (0, 255, 0), cv2.FILLED)
-                        cv2.putText(frame, f"{name} ({confidence}%)", (left + 6, bottom - 6), 
+                        cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+                        cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
+                        cv2.putText(frame, label, (left + 6, bottom - 6), 
                                    cv2.FONT_HERSHEY_DUPLEX, 0.6, (255, 255, 255), 1)
-                        
-                        # Auto-mark attendance if confidence is high enough
-                        if confidence > 75 and student_id not in attendance_marked:
-                            result = self.save_attendance(student_id, name)
-                            if result["success"]:
-                                attendance_marked.add(student_id)
-                                print(f"✓ {result['message']}")
-                            else:
-                                print(f"✗ {result['message']}")
-                    else:
-                        # Unknown face
-                        cv2.rectangle(frame, (left, top), (right, bottom), (0, 0, 255), 2)
-                        cv2.rectangle(frame, (left, bottom - 35), (right, bottom), (0, 0, 255), cv2.FILLED)
-                        cv2.putText(frame, "Unknown", (left + 6, bottom - 6), 
-                                   cv2.FONT_HERSHEY_DUPLEX, 0.6, (255, 255, 255), 1)
-                
-                # Display instructions
-                cv2.putText(frame, f"Attendance marked: {len(attendance_marked)}", (10, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                cv2.putText(frame, "Press 'q' to quit", (10, 60), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-                
-                cv2.imshow('Face Recognition Attendance', frame)
-                
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+                    
+                    # Display instructions
+                    cv2.putText(frame, f"Attendance marked: {len(attendance_marked)}", (10, 30), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                    cv2.putText(frame, "Press 'q' to quit", (10, 60), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                    
+                    cv2.imshow('Face Recognition Attendance', frame)
+                    
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        quit_requested = True
+                        break
+                    
+                    # Nothing left to recognize once every registered student is marked
+                    if len(attendance_marked) >= num_students:
+                        print("All registered students have been marked present")
+                        quit_requested = True
+                        break
             
-            cap.release()
+            self._stop_capture()
             cv2.destroyAllWindows()
             
+            # Make sure every queued record is written before reporting
+            self._attendance_queue.join()
+            
             return {"success": True, "message": f"Attendance session completed. {len(attendance_marked)} students marked present."}
             
         except Exception as e:
             return {"success": False, "message": f"Error during attendance marking: {str(e)}"}
     
-    def save_attendance(self, student_id, name):
+    def _attendance_writer(self):
+        """Consume queued (student_id, name, timestamp) records and save them"""
+        while True:
+            student_id, name, timestamp = self._attendance_queue.get()
+            try:
+                result = self.save_attendance(student_id, name, timestamp)
+                if result["success"]:
+                    print(f"✓ {result['message']}")
+                else:
+                    print(f"✗ {result['message']}")
+            finally:
+                self._attendance_queue.task_done()
+    
+    def save_attendance(self, student_id, name, timestamp=None):
         """Save attendance record"""
         try:
-            current_date = datetime.now().strftime('%Y-%m-%d')
-            current_time = datetime.now().strftime('%H:%M:%S')
-            
-            # Check if attendance already marked today
-            attendance_df = pd.read_csv(self.attendance_csv)
-            today_attendance = attendance_df[
-                (attendance_df['student_id'] == student_id) & 
-                (attendance_df['date'] == current_date)
-            ]
+            timestamp = timestamp or datetime.now()
+            current_date = timestamp.strftime('%Y-%m-%d')
+            current_time = timestamp.strftime('%H:%M:%S')
             
-            if not today_attendance.empty:
+            # Appended to the attendance CSV unless already marked today
+            if not self.db.add_attendance(student_id, name, current_date, current_time):
                 return {"success": False, "message": f"Attendance already marked for {name} today"}
             
-            # Add new attendance record
-            new_record = {
-                'student_id': student_id,
-                'name': name,
-                'date': current_date,
-                'time': current_time,
-                'status': 'Present'
-            }
-            
-            attendance_df = pd.concat([attendance_df, pd.DataFrame([new_record])], ignore_index=True)
-            attendance_df.to_csv(self.attendance_csv, index=False)
-            
             return {"success": True, "message": f"Attendance marked for {name} at {current_time}"}
             
         except Exception as e:
@@ -233,10 +567,7 @@ class AdvancedFaceRecognition:
     def get_attendance_report(self, date=None):
         """Get attendance report"""
         try:
-            attendance_df = pd.read_csv(self.attendance_csv)
-            if date:
-                attendance_df = attendance_df[attendance_df['date'] == date]
-            return attendance_df.to_dict('records')
+            return self.db.get_attendance(date)
         except Exception as e:
             print(f"Error getting attendance report: {str(e)}")
             return []
@@ -244,8 +575,7 @@ class AdvancedFaceRecognition:
     def get_students_list(self):
         """Get list of registered students"""
         try:
-            students_df = pd.read_csv(self.students_csv)
-            return students_df.to_dict('records')
+            return self.db.get_students()
         except Exception as e:
             print(f"Error getting students list: {str(e)}")
             return []
@@ -309,6 +639,7 @@ if __name__ == "__main__":
                 print("No students registered")
         
         elif choice == '5':
+            system.release_camera()
             print("Goodbye!")
             break
         
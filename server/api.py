@@ -3,8 +3,7 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional
 import os
-import pandas as pd
-from datetime import datetime
+import threading
 import uvicorn
 from face_recognition_system import FaceRecognitionSystem
 
@@ -25,11 +24,19 @@ class AttendanceQuery(BaseModel):
 async def root():
     return {"message": "Face Recognition Attendance System API"}
 
+# Handlers that touch the camera, model or data files are plain `def` so FastAPI
+# runs them in its threadpool instead of blocking the event loop
+
+# The webcam, recognizer and HighGUI windows are not thread-safe, so the camera and
+# model endpoints run one at a time; reports and stats stay concurrent
+camera_model_lock = threading.Lock()
+
 @app.post("/register-student")
-async def register_student(student: StudentRegistration):
+def register_student(student: StudentRegistration):
     """Register a new student"""
     try:
-        result = face_system.register_student(student.student_id, student.name, student.email)
+        with camera_model_lock:
+            result = face_system.register_student(student.student_id, student.name, student.email)
         if result["success"]:
             return JSONResponse(content=result, status_code=200)
         else:
@@ -38,10 +45,11 @@ async def register_student(student: StudentRegistration):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/train-model")
-async def train_model():
-    """Train the face recognition model"""
+def train_model(rebuild: bool = False):
+    """Train the face recognition model, re-encoding every student if rebuild is set"""
     try:
-        result = face_system.train_model()
+        with camera_model_lock:
+            result = face_system.train_model(rebuild)
         if result["success"]:
             return JSONResponse(content=result, status_code=200)
         else:
@@ -50,10 +58,11 @@ async def train_model():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/mark-attendance")
-async def mark_attendance():
+def mark_attendance():
     """Mark attendance using face recognition"""
     try:
-        result = face_system.mark_attendance()
+        with camera_model_lock:
+            result = face_system.mark_attendance()
         if result["success"]:
             return JSONResponse(content=result, status_code=200)
         else:
@@ -62,7 +71,7 @@ async def mark_attendance():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/attendance-report")
-async def get_attendance_report(date: Optional[str] = None):
+def get_attendance_report(date: Optional[str] = None):
     """Get attendance report"""
     try:
         records = face_system.get_attendance_report(date)
@@ -71,7 +80,7 @@ async def get_attendance_report(date: Optional[str] = None):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/students")
-async def get_students():
+def get_students():
     """Get list of all registered students"""
     try:
         students = face_system.get_students_list()
@@ -80,25 +89,18 @@ async def get_students():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/attendance-stats")
-async def get_attendance_stats():
+def get_attendance_stats():
     """Get attendance statistics"""
     try:
-        attendance_df = pd.read_csv(face_system.attendance_csv)
-        students_df = pd.read_csv(face_system.students_csv)
-        
-        total_students = len(students_df)
-        today_date = datetime.now().strftime('%Y-%m-%d')
-        today_attendance = len(attendance_df[attendance_df['date'] == today_date])
-        
-        stats = {
-            "total_students": total_students,
-            "today_attendance": today_attendance,
-            "attendance_percentage": round((today_attendance / total_students * 100), 2) if total_students > 0 else 0
-        }
-        
+        stats = face_system.get_attendance_stats()
         return JSONResponse(content=stats, status_code=200)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Each worker is a separate process with its own FaceRecognitionSystem, recognizer
+    # and camera handle, and one webcam cannot serve several processes at once. Extra
+    # workers (API_WORKERS) only help the CSV-backed report and stats endpoints;
+    # shared state lives in the CSV/model files, guarded by file locks
+    workers = int(os.environ.get("API_WORKERS", 1))
+    uvicorn.run("api:app", host="0.0.0.0", port=8000, workers=workers)
@@ -0,0 +1,233 @@
+"""
+SQLite index over the students and attendance CSV files
+The CSVs stay the record every system appends to; the database mirrors them
+so duplicate checks and reports are indexed queries instead of file scans
+"""
+
+import csv
+import io
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+STUDENT_COLUMNS = ['student_id', 'name', 'email', 'registration_date']
+ATTENDANCE_COLUMNS = ['student_id', 'name', 'date', 'time', 'status']
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive inter-process lock on path + '.lock' while the block runs
+
+    API workers are separate processes, so a threading.Lock cannot stop two of
+    them from rewriting the same CSV at once.
+    """
+    with open(path + ".lock", "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def append_csv_row(path, row, header=None):
+    """Append one row to a CSV file with a single write
+
+    The row is formatted first and written with one os.write on an O_APPEND
+    descriptor, so writers appending at the same time never interleave partial
+    lines. header is written first when the file is new or empty.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header and (not os.path.exists(path) or os.path.getsize(path) == 0):
+        writer.writerow(header)
+    writer.writerow(row)
+    # O_BINARY stops Windows from turning the newline into \r\n
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0))
+    try:
+        os.write(fd, buffer.getvalue().encode('utf-8'))
+    finally:
+        os.close(fd)
+
+
+class AttendanceDatabase:
+    """Thread-safe SQLite index kept in step with the students and attendance CSVs"""
+
+    def __init__(self, db_path="data/attendance.db", students_csv=None, attendance_csv=None):
+        self.db_path = db_path
+        self.students_csv = students_csv
+        self.attendance_csv = attendance_csv
+
+        # One shared connection; WAL lets readers run while a write is in progress
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.create_tables()
+
+        # Pick up whatever the CSVs gained since this database last saw them
+        self.sync_csv_files()
+
+    def create_tables(self):
+        """Create tables if they don't exist"""
+        with self._lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS students (
+                    student_id INTEGER PRIMARY KEY,
+                    name TEXT,
+                    email TEXT,
+                    registration_date TEXT
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS attendance (
+                    student_id INTEGER,
+                    name TEXT,
+                    date TEXT,
+                    time TEXT,
+                    status TEXT,
+                    PRIMARY KEY (student_id, date)
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(date)")
+            # Bytes of each CSV already imported, so a sync only parses the new tail
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS csv_offsets (
+                    table_name TEXT PRIMARY KEY,
+                    offset INTEGER
+                )
+            """)
+
+    def sync_csv_files(self):
+        """Import the rows appended to the CSV files since the last sync"""
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so two processes never import the same tail
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._sync_table('students', self.students_csv, STUDENT_COLUMNS)
+                self._sync_table('attendance', self.attendance_csv, ATTENDANCE_COLUMNS)
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+
+    def _sync_table(self, table, path, columns):
+        """Import one CSV's unseen complete lines into table; caller holds the transaction"""
+        if not path or not os.path.exists(path):
+            return
+        row = self.conn.execute("SELECT offset FROM csv_offsets WHERE table_name = ?", (table,)).fetchone()
+        offset = row[0] if row else 0
+
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < offset:
+                # The file was rewritten (e.g. edited or restored); rebuild the table from scratch
+                self.conn.execute(f"DELETE FROM {table}")
+                offset = 0
+            if size == offset:
+                return
+            f.seek(offset)
+            data = f.read(size - offset)
+
+        # A writer may be mid-append; leave a trailing partial line for the next sync
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return
+        reader = csv.reader(io.StringIO(data[:end].decode('utf-8')))
+        if offset == 0:
+            next(reader, None)  # header row
+        records = [(int(r[0]), *r[1:]) for r in reader if len(r) == len(columns) and r[0].isdigit()]
+
+        placeholders = ", ".join("?" * len(columns))
+        self.conn.executemany(f"INSERT OR IGNORE INTO {table} VALUES ({placeholders})", records)
+        self.conn.execute("INSERT OR REPLACE INTO csv_offsets VALUES (?, ?)", (table, offset + end))
+
+    def student_exists(self, student_id):
+        """Check if a student ID is already registered"""
+        self.sync_csv_files()
+        with self._lock:
+            row = self.conn.execute("SELECT 1 FROM students WHERE student_id = ?", (int(student_id),)).fetchone()
+        return row is not None
+
+    def get_student_ids(self):
+        """Get the set of all registered student IDs"""
+        self.sync_csv_files()
+        with self._lock:
+            rows = self.conn.execute("SELECT student_id FROM students").fetchall()
+        return {row[0] for row in rows}
+
+    def add_student(self, student_id, name, email, registration_date):
+        """Append a student to the students CSV, returns False if the ID already exists"""
+        with file_lock(self.students_csv):
+            if self.student_exists(student_id):
+                return False
+            append_csv_row(self.students_csv, [student_id, name, email, registration_date], STUDENT_COLUMNS)
+            self.sync_csv_files()
+        return True
+
+    def add_attendance(self, student_id, name, date, time, status='Present'):
+        """Append an attendance record to the attendance CSV, returns False if already marked for that date"""
+        with file_lock(self.attendance_csv):
+            self.sync_csv_files()
+            with self._lock:
+                row = self.conn.execute("SELECT 1 FROM attendance WHERE student_id = ? AND date = ?",
+                                        (int(student_id), date)).fetchone()
+            if row is not None:
+                return False
+            append_csv_row(self.attendance_csv, [student_id, name, date, time, status], ATTENDANCE_COLUMNS)
+            self.sync_csv_files()
+        return True
+
+    def get_attendance(self, date=None):
+        """Get attendance records for a specific date or all dates"""
+        return [dict(row) for row in self.iter_attendance(date)]
+
+    def get_students(self):
+        """Get all registered students"""
+        return [dict(row) for row in self.iter_students()]
+
+    def iter_attendance(self, date=None, batch_size=1000):
+        """Yield attendance rows for one date or all dates without materialising the table"""
+        if date:
+            yield from self._iter_query("SELECT * FROM attendance WHERE date = ? ORDER BY time", (date,), batch_size)
+        else:
+            yield from self._iter_query("SELECT * FROM attendance ORDER BY date, time", (), batch_size)
+
+    def iter_students(self, batch_size=1000):
+        """Yield registered students ordered by registration date"""
+        yield from self._iter_query("SELECT * FROM students ORDER BY registration_date", (), batch_size)
+
+    def _iter_query(self, sql, params, batch_size):
+        """Run sql on a synced database and yield its rows batch_size at a time"""
+        self.sync_csv_files()
+        # A separate cursor keeps batches valid while other threads use the connection
+        with self._lock:
+            cursor = self.conn.execute(sql, params)
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self.conn.close()
@@ -1,10 +1,59 @@
 import cv2
 import os
+import json
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import pickle
-from PIL import Image
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import cached_property
+from attendance_db import append_csv_row, file_lock
+
+try:
+    import dlib
+    import face_recognition
+except ImportError:  # dlib needs C++ build tools on Windows; fall back to LBPH
+    dlib = None
+    face_recognition = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Same Euclidean tolerance face_recognition.compare_faces uses for 128-D dlib embeddings
+EMBEDDING_TOLERANCE = 0.6
+
+# Frames per batched CNN detection call on CUDA builds of dlib
+CUDA_DETECTION_BATCH_SIZE = 8
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+
+# Side length training crops are stored at
+FACE_SIZE = 200
+
+# Resolution requested from the webcam
+CAMERA_WIDTH = 1280
+CAMERA_HEIGHT = 720
+
+# Smallest detectable face as a fraction of frame height (120px at 720p)
+FACE_MIN_DIVISOR = 6
+
+# From OpenCV's data/lbpcascades folder; copy it into models/ if your build lacks it
+LBP_CASCADE_FILE = 'lbpcascade_frontalface_improved.xml'
+
+# Column types for the CSV files, so pandas skips type inference on every read
+STUDENT_DTYPES = {'student_id': 'int32', 'name': str, 'email': str, 'registration_date': str}
+ATTENDANCE_DTYPES = {'student_id': 'int32', 'name': str, 'date': str, 'time': str, 'status': 'category'}
+
+# Registration capture detects on a half-size frame; crops are still cut at full resolution
+CAPTURE_DETECTION_SCALE = 0.5
+
+# Attendance detection runs on a quarter-size frame, on every other frame
+ATTENDANCE_DETECTION_SCALE = 0.25
+ATTENDANCE_DETECTION_INTERVAL = 2
+
 
 class FaceRecognitionSystem:
     def __init__(self):
@@ -12,7 +61,10 @@ class FaceRecognitionSystem:
         self.attendance_csv = "data/attendance.csv"
         self.training_folder = "training_images"
         self.model_file = "models/face_model.yml"
-        self.encodings_file = "models/face_encodings.pkl"
+        self.encodings_file = "models/face_embeddings.npy"
+        self.embedding_ids_file = "models/face_embedding_ids.npy"
+        self.trained_folders_file = "models/trained_folders.json"
+        self.face_detector_model = "models/face_detection_yunet_2023mar.onnx"
         
         # Create necessary directories
         os.makedirs("data", exist_ok=True)
@@ -20,13 +72,52 @@ class FaceRecognitionSystem:
         os.makedirs("models", exist_ok=True)
         os.makedirs("temp_captures", exist_ok=True)
         
-        # Initialize face recognizer
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        self.recognizer = cv2.face.LBPHFaceRecognizer_create()
+        # Initialize face detector; the LBPH recognizer is created on first use
+        self.face_cascade = self._load_face_cascade()
+        
+        # Prefer the YuNet DNN detector when its ONNX model has been downloaded
+        self.face_detector = None
+        if os.path.exists(self.face_detector_model):
+            if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                backend, target = cv2.dnn.DNN_BACKEND_CUDA, cv2.dnn.DNN_TARGET_CUDA
+            else:
+                backend, target = cv2.dnn.DNN_BACKEND_DEFAULT, cv2.dnn.DNN_TARGET_CPU
+            self.face_detector = cv2.FaceDetectorYN.create(
+                self.face_detector_model, "", (320, 320), 0.9, 0.3, 5000, backend, target)
+        
+        # Let the cascade run its OpenCL kernels when a GPU device is present
+        self.use_opencl = cv2.ocl.haveOpenCL()
+        cv2.ocl.setUseOpenCL(self.use_opencl)
+        
+        # Match on one cached embedding per student when dlib is available
+        self.use_embeddings = face_recognition is not None
+        self._index = None
+        self._embedding_matrix = None
+        self._embedding_ids = None
+        self._encodings_mtime = None
+        self._face_buffer = np.empty((FACE_SIZE, FACE_SIZE), dtype=np.uint8)
+        
+        # The CNN detector only beats Haar when dlib can batch frames on the GPU
+        if dlib is not None and dlib.DLIB_USE_CUDA:
+            self.detection_batch_size = CUDA_DETECTION_BATCH_SIZE
+        else:
+            self.detection_batch_size = 1
+        
+        # Open for one capture or attendance session, so other API workers can use the webcam in between
+        self._cap = None
         
         # Initialize CSV files if they don't exist
         self.init_csv_files()
         
+        # In-memory counters so stats requests never re-read the CSV files
+        self._stats_lock = threading.Lock()
+        self.init_stats_counters()
+        
+    @cached_property
+    def recognizer(self):
+        """LBPH recognizer, only built when training or recognition needs it"""
+        return cv2.face.LBPHFaceRecognizer_create()
+    
     def init_csv_files(self):
         """Initialize CSV files with headers if they don't exist"""
         if not os.path.exists(self.students_csv):
@@ -37,12 +128,61 @@ class FaceRecognitionSystem:
             df = pd.DataFrame(columns=['student_id', 'name', 'date', 'time', 'status'])
             df.to_csv(self.attendance_csv, index=False)
     
+    def _file_signature(self, path):
+        """Modification time and size of one CSV file"""
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _csv_signature(self):
+        """(students, attendance) file signatures, to spot writes by other workers"""
+        return self._file_signature(self.students_csv), self._file_signature(self.attendance_csv)
+    
+    def init_stats_counters(self):
+        """Load student IDs and today's marked students from the CSV files"""
+        signature = self._csv_signature()
+        students_df = pd.read_csv(self.students_csv, usecols=['student_id'], dtype=STUDENT_DTYPES)
+        attendance_df = pd.read_csv(self.attendance_csv, usecols=['student_id', 'date'], dtype=ATTENDANCE_DTYPES)
+        
+        with self._stats_lock:
+            self._today = datetime.now().strftime('%Y-%m-%d')
+            self._student_ids = set(students_df['student_id'].tolist())
+            self._total_students = len(students_df)
+            # Only today's records matter for duplicate checks; earlier days are never consulted
+            self._marked_today = set(attendance_df.loc[attendance_df['date'] == self._today, 'student_id'].tolist())
+            self._stats_signature = signature
+    
+    def _refresh_if_stale(self):
+        """Reload the in-memory state if another API worker wrote one of the CSV files"""
+        if self._csv_signature() != self._stats_signature:
+            self.init_stats_counters()
+    
+    def _roll_over_day(self, date):
+        """Clear today's marked students when the date changes; caller holds _stats_lock"""
+        if date != self._today:
+            self._today = date
+            self._marked_today = set()
+    
+    def get_attendance_stats(self):
+        """Get attendance statistics from the cached counters"""
+        self._refresh_if_stale()
+        
+        with self._stats_lock:
+            self._roll_over_day(datetime.now().strftime('%Y-%m-%d'))
+            total_students = self._total_students
+            today_attendance = len(self._marked_today)
+        
+        return {
+            "total_students": total_students,
+            "today_attendance": today_attendance,
+            "attendance_percentage": round((today_attendance / total_students * 100), 2) if total_students > 0 else 0
+        }
+    
     def register_student(self, student_id, name, email):
         """Register a new student and capture their face images"""
         try:
             # Check if student already exists
-            students_df = pd.read_csv(self.students_csv)
-            if student_id in students_df['student_id'].values:
+            self._refresh_if_stale()
+            if student_id in self._student_ids:
                 return {"success": False, "message": "Student ID already exists"}
             
             # Create student folder
@@ -54,16 +194,22 @@ class FaceRecognitionSystem:
             if not captured:
                 return {"success": False, "message": "Failed to capture face images"}
             
-            # Add student to CSV
-            new_student = {
-                'student_id': student_id,
-                'name': name,
-                'email': email,
-                'registration_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
+            registration_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
-            students_df = pd.concat([students_df, pd.DataFrame([new_student])], ignore_index=True)
-            students_df.to_csv(self.students_csv, index=False)
+            with file_lock(self.students_csv):
+                # Re-check under the lock: another worker may have registered meanwhile
+                self._refresh_if_stale()
+                if student_id in self._student_ids:
+                    return {"success": False, "message": "Student ID already exists"}
+                
+                # Add student to CSV
+                append_csv_row(self.students_csv, [student_id, name, email, registration_date])
+                
+                with self._stats_lock:
+                    self._student_ids.add(student_id)
+                    self._total_students += 1
+                    # Only the students file is locked here; a stale attendance part still forces a reload
+                    self._stats_signature = (self._file_signature(self.students_csv), self._stats_signature[1])
             
             print(f"Student {name} registered successfully!")
             return {"success": True, "message": f"Student {name} registered successfully!"}
@@ -71,76 +217,242 @@ class FaceRecognitionSystem:
         except Exception as e:
             return {"success": False, "message": f"Error registering student: {str(e)}"}
     
-    def capture_face_images(self, student_id, folder_path, num_images=30):
-        """Capture face images for training"""
-        cap = cv2.VideoCapture(0)
-        count = 0
+    def _detect_faces_haar(self, gray):
+        """Haar cascade face boxes (x, y, w, h) in a grayscale frame"""
+        # Crops are still cut from the host copy, so only the detector input is uploaded
+        # Bound the window sizes so the cascade skips pyramid levels no face can match
+        height = gray.shape[0]
+        return self.face_cascade.detectMultiScale(
+            cv2.UMat(gray) if self.use_opencl else gray, scaleFactor=1.3, minNeighbors=5,
+            minSize=(height // FACE_MIN_DIVISOR,) * 2, maxSize=(height,) * 2,
+            flags=cv2.CASCADE_SCALE_IMAGE)
+    
+    def _load_face_cascade(self):
+        """LBP face cascade, or the Haar cascade if the LBP file is missing
         
-        print(f"Capturing images for Student ID: {student_id}")
-        print("Look at the camera and press SPACE to capture images, ESC to cancel")
+        LBP features are integer comparisons, so detection runs 2-3x faster than Haar.
+        """
+        for path in (os.path.join("models", LBP_CASCADE_FILE), cv2.data.haarcascades + LBP_CASCADE_FILE):
+            if os.path.exists(path):
+                cascade = cv2.CascadeClassifier(path)
+                if not cascade.empty():
+                    return cascade
+        
+        return cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    
+    def _detect_faces_yunet(self, frame):
+        """YuNet face boxes (x, y, w, h) in a BGR frame"""
+        height, width = frame.shape[:2]
+        self.face_detector.setInputSize((width, height))
+        _, detections = self.face_detector.detect(frame)
+        if detections is None:
+            return np.empty((0, 4), dtype=np.int32)
+        
+        # Each row is x, y, w, h, five landmark points and a score
+        faces = detections[:, :4].astype(np.int32)
+        faces[:, :2] = np.maximum(faces[:, :2], 0)
+        return faces
+    
+    def _detect_faces_batch(self, frames, scale=1.0):
+        """Return (gray, faces) for each BGR frame, faces as full-size (x, y, w, h) boxes
+        
+        Detection runs on frames resized by scale; gray stays full size for cropping.
+        """
+        # The green channel carries most of the luma and is a plain copy instead of a weighted sum
+        grays = [cv2.extractChannel(frame, 1) for frame in frames]
+        
+        if self.detection_batch_size == 1:
+            results = []
+            for frame, gray in zip(frames, grays):
+                if self.face_detector is not None:
+                    small_frame = cv2.resize(frame, (0, 0), fx=scale, fy=scale) if scale != 1.0 else frame
+                    faces = self._detect_faces_yunet(small_frame)
+                else:
+                    small_gray = cv2.resize(gray, (0, 0), fx=scale, fy=scale) if scale != 1.0 else gray
+                    faces = self._detect_faces_haar(small_gray)
+                results.append((gray, faces))
+        else:
+            if scale != 1.0:
+                frames = [cv2.resize(frame, (0, 0), fx=scale, fy=scale) for frame in frames]
+            rgb_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]
+            batch_locations = face_recognition.batch_face_locations(
+                rgb_frames, number_of_times_to_upsample=0, batch_size=len(rgb_frames))
+            
+            results = []
+            for gray, locations in zip(grays, batch_locations):
+                faces = np.array([(left, top, right - left, bottom - top)
+                                  for top, right, bottom, left in locations], dtype=np.int32).reshape(-1, 4)
+                # CNN boxes can extend past the frame edge
+                faces[:, :2] = np.maximum(faces[:, :2], 0)
+                results.append((gray, faces))
         
-        while count < num_images:
+        if scale != 1.0:
+            results = [(gray, (np.asarray(faces, dtype=np.float32).reshape(-1, 4) / scale).astype(np.int32))
+                       for gray, faces in results]
+        return results
+    
+    def _detected_frames(self, cap, scale=1.0, detect_every=1):
+        """Yield (frame, gray, faces) from the camera, detecting faces a batch of frames at a time
+        
+        Only every detect_every-th frame goes through the detector; the frames in
+        between are yielded with gray and faces set to None.
+        """
+        pending = []
+        detect_frames = []
+        frame_count = 0
+        while True:
             ret, frame = cap.read()
             if not ret:
                 break
-                
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
             
-            for (x, y, w, h) in faces:
-                cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
-                face_region = gray[y:y+h, x:x+w]
-                
-            cv2.putText(frame, f'Images captured: {count}/{num_images}', (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.putText(frame, 'Press SPACE to capture, ESC to cancel', (10, 70), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            detect = frame_count % detect_every == 0
+            frame_count += 1
+            pending.append((frame, detect))
+            if detect:
+                detect_frames.append(frame)
             
-            cv2.imshow('Face Capture', frame)
+            # Hold frames back only while a detection batch is still filling up
+            if detect_frames and len(detect_frames) < self.detection_batch_size:
+                continue
             
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord(' '):  # Space key
+            results = iter(self._detect_faces_batch(detect_frames, scale) if detect_frames else [])
+            for frame, detect in pending:
+                gray, faces = next(results) if detect else (None, None)
+                yield frame, gray, faces
+            pending = []
+            detect_frames = []
+    
+    def _get_camera(self):
+        """Return the session's webcam, opening and configuring it only if it is not open yet"""
+        if self._cap is None or not self._cap.isOpened():
+            # DirectShow opens much faster than the default MSMF backend on Windows
+            self._cap = cv2.VideoCapture(0, cv2.CAP_DSHOW) if os.name == 'nt' else cv2.VideoCapture(0)
+            self._cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+            self._cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
+            self._cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
+            # Keep at most one queued frame so reads are never stale
+            self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return self._cap
+    
+    def release_camera(self):
+        """Release the webcam at the end of a session"""
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+    
+    def capture_face_images(self, student_id, folder_path, num_images=30):
+        """Capture face images for training"""
+        cap = self._get_camera()
+        count = 0
+        
+        print(f"Capturing images for Student ID: {student_id}")
+        print("Look at the camera and press SPACE to capture images, ESC to cancel")
+        
+        try:
+            for frame, gray, faces in self._detected_frames(cap, CAPTURE_DETECTION_SCALE):
+                face_region = None
                 if len(faces) > 0:
-                    face_img = gray[faces[0][1]:faces[0][1]+faces[0][3], 
-                                  faces[0][0]:faces[0][0]+faces[0][2]]
-                    img_name = f"{student_id}_{count}.jpg"
-                    cv2.imwrite(os.path.join(folder_path, img_name), face_img)
-                    count += 1
-                    print(f"Image {count} captured")
-                else:
-                    print("No face detected, try again")
-            elif key == 27:  # ESC key
-                break
+                    # Train on the largest (closest) face when several are in view
+                    faces = np.asarray(faces)
+                    x, y, w, h = faces[int(np.argmax(faces[:, 2] * faces[:, 3]))]
+                    cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
+                    face_region = gray[y:y+h, x:x+w]
+                
+                cv2.putText(frame, f'Images captured: {count}/{num_images}', (10, 30), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                cv2.putText(frame, 'Press SPACE to capture, ESC to cancel', (10, 70), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                
+                cv2.imshow('Face Capture', frame)
+                
+                key = cv2.waitKey(1) & 0xFF
+                if key == ord(' '):  # Space key
+                    if face_region is not None:
+                        img_name = f"{student_id}_{count}.jpg"
+                        cv2.imwrite(os.path.join(folder_path, img_name), cv2.resize(face_region, (FACE_SIZE, FACE_SIZE)))
+                        count += 1
+                        print(f"Image {count} captured")
+                    else:
+                        print("No face detected, try again")
+                elif key == 27:  # ESC key
+                    break
                 
-        cap.release()
-        cv2.destroyAllWindows()
+                if count >= num_images:
+                    break
+        finally:
+            cv2.destroyAllWindows()
+            self.release_camera()
         
         return count >= 10  # Minimum 10 images required
     
-    def train_model(self):
-        """Train the face recognition model"""
+    def train_model(self, rebuild=False):
+        """Train the face recognition model
+        
+        With embeddings only student folders changed since the last run are
+        re-encoded, unless rebuild is set. LBPH always retrains on every image.
+        """
         try:
-            faces = []
-            labels = []
+            trained_folders = {} if rebuild or not self.use_embeddings else self._load_trained_folders()
+            folder_mtimes = {}
+            image_paths = []
+            image_labels = []
             
-            # Read all training images
-            for student_folder in os.listdir(self.training_folder):
-                student_id = int(student_folder)
-                folder_path = os.path.join(self.training_folder, student_folder)
-                
-                for image_name in os.listdir(folder_path):
-                    if image_name.endswith(('.jpg', '.jpeg', '.png')):
-                        image_path = os.path.join(folder_path, image_name)
-                        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-                        
-                        if image is not None:
-                            faces.append(image)
-                            labels.append(student_id)
+            # Collect all training images
+            with os.scandir(self.training_folder) as student_folders:
+                for student_folder in student_folders:
+                    if not student_folder.is_dir():
+                        continue
+                    student_id = int(student_folder.name)
+                    
+                    # Adding or removing images updates the folder mtime
+                    folder_mtimes[student_folder.name] = student_folder.stat().st_mtime_ns
+                    if trained_folders.get(student_folder.name) == folder_mtimes[student_folder.name]:
+                        continue
+                    
+                    with os.scandir(student_folder.path) as entries:
+                        for entry in entries:
+                            if entry.is_file() and entry.name.rpartition('.')[2].lower() in IMAGE_EXTENSIONS:
+                                image_paths.append(entry.path)
+                                image_labels.append(student_id)
+            
+            # Decode straight into one contiguous (N, FACE_SIZE, FACE_SIZE) buffer
+            faces = np.empty((len(image_paths), FACE_SIZE, FACE_SIZE), dtype=np.uint8)
+            labels = np.array(image_labels, dtype=np.int32)
+            
+            def load_image(i):
+                image = cv2.imread(image_paths[i], cv2.IMREAD_GRAYSCALE)
+                if image is None:
+                    return False
+                # Crops captured before faces were stored at a fixed size
+                if image.shape != (FACE_SIZE, FACE_SIZE):
+                    image = cv2.resize(image, (FACE_SIZE, FACE_SIZE))
+                faces[i] = image
+                return True
+            
+            # cv2.imread releases the GIL, so JPEG decoding runs in parallel across threads
+            with ThreadPoolExecutor() as executor:
+                loaded = np.fromiter(executor.map(load_image, range(len(image_paths))), dtype=bool,
+                                     count=len(image_paths))
+            
+            if not loaded.all():
+                faces = faces[loaded]
+                labels = labels[loaded]
+            
+            if trained_folders:
+                return self._update_encodings(faces, labels, folder_mtimes)
             
             if len(faces) > 0:
-                # Train the recognizer
-                self.recognizer.train(faces, np.array(labels))
-                self.recognizer.save(self.model_file)
+                if self.use_embeddings:
+                    self.save_encodings(self.build_encodings(faces, labels))
+                    self._save_trained_folders(folder_mtimes)
+                else:
+                    # Train the recognizer
+                    self.recognizer.train(faces, labels)
+                    
+                    # Save to a temporary file and swap it in so other API workers never read a partial model
+                    temp_model_file = self.model_file.replace('.yml', '.tmp.yml')
+                    self.recognizer.save(temp_model_file)
+                    os.replace(temp_model_file, self.model_file)
                 print(f"Model trained with {len(faces)} images")
                 return {"success": True, "message": f"Model trained successfully with {len(faces)} images"}
             else:
@@ -149,56 +461,190 @@ class FaceRecognitionSystem:
         except Exception as e:
             return {"success": False, "message": f"Error training model: {str(e)}"}
     
+    def _load_trained_folders(self):
+        """Folder mtimes recorded by the last embedding run, empty if a full run is needed"""
+        if not (os.path.exists(self.trained_folders_file) and os.path.exists(self.encodings_file)):
+            return {}
+        with open(self.trained_folders_file, 'r') as f:
+            return json.load(f)
+    
+    def _save_trained_folders(self, folder_mtimes):
+        """Record the folder mtimes the stored embeddings were built from"""
+        temp_folders_file = self.trained_folders_file + ".tmp"
+        with open(temp_folders_file, 'w') as f:
+            json.dump(folder_mtimes, f)
+        os.replace(temp_folders_file, self.trained_folders_file)
+    
+    def _update_encodings(self, faces, labels, folder_mtimes):
+        """Merge re-encoded students into the stored embeddings and drop deleted ones"""
+        new_encodings = self.build_encodings(faces, labels)
+        
+        stored_mtime = os.stat(self.encodings_file).st_mtime_ns
+        stored_ids = np.load(self.embedding_ids_file)
+        stored_matrix = np.load(self.encodings_file)
+        current_ids = {int(folder_name) for folder_name in folder_mtimes}
+        encodings = {int(student_id): row for student_id, row in zip(stored_ids, stored_matrix)
+                     if int(student_id) in current_ids}
+        
+        if not new_encodings and len(encodings) == len(stored_ids):
+            return {"success": True, "message": "Model is already up to date"}
+        
+        added_ids = [student_id for student_id in new_encodings if student_id not in encodings]
+        only_added = len(added_ids) == len(new_encodings) and len(encodings) == len(stored_ids)
+        
+        # New students land after the existing rows, so a loaded index stays valid as a prefix
+        encodings.update(new_encodings)
+        if not encodings:
+            return {"success": False, "message": "No training images found"}
+        
+        self.save_encodings(encodings)
+        self._save_trained_folders(folder_mtimes)
+        
+        if only_added and self._index is not None and self._encodings_mtime == stored_mtime:
+            if added_ids:
+                self._index.add(np.vstack([new_encodings[student_id] for student_id in added_ids]))
+                self._embedding_ids = np.load(self.embedding_ids_file)
+                self._embedding_matrix = np.load(self.encodings_file)
+            self._encodings_mtime = os.stat(self.encodings_file).st_mtime_ns
+        
+        print(f"Model updated: {len(new_encodings)} students encoded from {len(faces)} images")
+        return {"success": True,
+                "message": f"Model updated: {len(new_encodings)} students encoded from {len(faces)} images"}
+    
+    def _encode_face(self, face_region):
+        """Compute the 128-D embedding of a grayscale face crop"""
+        # Training crops are grayscale, so live frames are encoded from gray too
+        h, w = face_region.shape
+        rgb = cv2.cvtColor(face_region, cv2.COLOR_GRAY2RGB)
+        return face_recognition.face_encodings(rgb, [(0, w, h, 0)])[0]
+    
+    def build_encodings(self, faces, labels):
+        """Average the embeddings of each student's training images into one vector"""
+        per_student = {}
+        for face, student_id in zip(faces, labels):
+            per_student.setdefault(int(student_id), []).append(self._encode_face(face))
+        
+        return {student_id: np.mean(encodings, axis=0).astype(np.float32)
+                for student_id, encodings in per_student.items()}
+    
+    def save_encodings(self, encodings):
+        """Save per-student embeddings as a float32 matrix plus a parallel ID array"""
+        student_ids = np.array(list(encodings.keys()), dtype=np.int64)
+        matrix = np.vstack(list(encodings.values())).astype(np.float32)
+        
+        # Write both arrays to temporary files and swap them in so other API workers never read a partial file
+        temp_ids_file = self.embedding_ids_file.replace('.npy', '.tmp.npy')
+        temp_encodings_file = self.encodings_file.replace('.npy', '.tmp.npy')
+        np.save(temp_ids_file, student_ids)
+        np.save(temp_encodings_file, matrix)
+        os.replace(temp_ids_file, self.embedding_ids_file)
+        os.replace(temp_encodings_file, self.encodings_file)
+    
+    def load_encodings(self):
+        """Load the per-student embeddings and build the nearest-neighbour index"""
+        # Skip the reload when nothing has rewritten the file since the index was built
+        encodings_mtime = os.stat(self.encodings_file).st_mtime_ns
+        if encodings_mtime == self._encodings_mtime:
+            return
+        
+        self._encodings_mtime = encodings_mtime
+        self._embedding_ids = np.load(self.embedding_ids_file)
+        # Read into memory rather than mapped: Windows refuses to replace a file any worker still maps,
+        # and at 512 bytes per student the copy is small
+        self._embedding_matrix = np.load(self.encodings_file)
+        
+        if faiss is not None:
+            self._index = faiss.IndexFlatL2(self._embedding_matrix.shape[1])
+            self._index.add(self._embedding_matrix)
+        else:
+            self._index = None
+    
+    def _search_encoding(self, encoding):
+        """Return (student_id, distance) of the closest stored embedding"""
+        query = np.asarray(encoding, dtype=np.float32)
+        if self._index is not None:
+            distances, indices = self._index.search(query[None], 1)
+            # IndexFlatL2 reports squared distances
+            return int(self._embedding_ids[indices[0, 0]]), float(np.sqrt(distances[0, 0]))
+        
+        distances = np.linalg.norm(self._embedding_matrix - query, axis=1)
+        best = int(np.argmin(distances))
+        return int(self._embedding_ids[best]), float(distances[best])
+    
+    def _recognize_face(self, gray, x, y, w, h):
+        """Identify the face in the given box, returns (student_id, confidence %) or (None, None)"""
+        face_region = gray[y:y+h, x:x+w]
+        
+        if self.use_embeddings:
+            student_id, distance = self._search_encoding(self._encode_face(face_region))
+            if distance < EMBEDDING_TOLERANCE:
+                return student_id, round((1 - distance) * 100, 1)
+            return None, None
+        
+        # Predict on a contiguous crop the same size as the training faces, reusing one buffer
+        cv2.resize(face_region, (FACE_SIZE, FACE_SIZE), dst=self._face_buffer)
+        student_id, confidence = self.recognizer.predict(self._face_buffer)
+        
+        # Check confidence (lower is better)
+        if confidence < 50:  # Adjust threshold as needed
+            return student_id, round(100 - confidence, 1)
+        return None, None
+    
     def mark_attendance(self):
         """Mark attendance using face recognition"""
         try:
             # Load the trained model
-            if not os.path.exists(self.model_file):
+            model_file = self.encodings_file if self.use_embeddings else self.model_file
+            if not os.path.exists(model_file):
                 return {"success": False, "message": "Model not trained yet. Please train the model first."}
             
-            self.recognizer.read(self.model_file)
+            if self.use_embeddings:
+                self.load_encodings()
+            else:
+                self.recognizer.read(self.model_file)
             
             # Load students data
-            students_df = pd.read_csv(self.students_csv)
+            students_df = pd.read_csv(self.students_csv, usecols=['student_id', 'name'], dtype=STUDENT_DTYPES)
+            id_to_name = dict(zip(students_df['student_id'].tolist(), students_df['name'].tolist()))
             
-            cap = cv2.VideoCapture(0)
+            cap = self._get_camera()
             attendance_marked = False
             recognized_student = None
             
             print("Face Recognition for Attendance")
             print("Position your face in front of the camera, press 'q' to quit")
             
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
+            # Label text only changes when detection runs, so none of it is formatted per frame
+            name_labels = {student_id: f'{name} (ID: {student_id})' for student_id, name in id_to_name.items()}
+            face_labels = []
+            
+            for frame, gray, faces in self._detected_frames(cap, ATTENDANCE_DETECTION_SCALE,
+                                                            ATTENDANCE_DETECTION_INTERVAL):
+                # Skipped frames reuse the boxes and labels from the last detected frame
+                if faces is not None:
+                    face_labels = []
+                    for (x, y, w, h) in faces:
+                        # Recognize face
+                        student_id, confidence = self._recognize_face(gray, x, y, w, h)
+                        name_label = name_labels.get(student_id)
+                        confidence_label = None
+                        
+                        if name_label is not None:
+                            recognized_student = (student_id, id_to_name[student_id])
+                            confidence_label = f'Confidence: {confidence}%'
+                        
+                        face_labels.append(((x, y), (x+w, y+h), (x, y-10), (x, y+h+30), name_label, confidence_label))
                 
-                for (x, y, w, h) in faces:
-                    cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
-                    face_region = gray[y:y+h, x:x+w]
+                for top_left, bottom_right, name_origin, confidence_origin, name_label, confidence_label in face_labels:
+                    cv2.rectangle(frame, top_left, bottom_right, (255, 0, 0), 2)
                     
-                    # Recognize face
-                    student_id, confidence = self.recognizer.predict(face_region)
-                    
-                    # Check confidence (lower is better)
-                    if confidence < 50:  # Adjust threshold as needed
-                        student_info = students_df[students_df['student_id'] == student_id]
-                        if not student_info.empty:
-                            name = student_info.iloc[0]['name']
-                            cv2.putText(frame, f'{name} (ID: {student_id})', (x, y-10), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-                            cv2.putText(frame, f'Confidence: {round(100-confidence, 1)}%', (x, y+h+30), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                            
-                            recognized_student = (student_id, name)
-                        else:
-                            cv2.putText(frame, 'Unknown', (x, y-10), 
-                                       cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+                    if name_label is not None:
+                        cv2.putText(frame, name_label, name_origin, 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+                        cv2.putText(frame, confidence_label, confidence_origin, 
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
                     else:
-                        cv2.putText(frame, 'Unknown', (x, y-10), 
+                        cv2.putText(frame, 'Unknown', name_origin, 
                                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
                 
                 cv2.putText(frame, 'Press SPACE to mark attendance, Q to quit', (10, 30), 
@@ -215,7 +661,6 @@ class FaceRecognitionSystem:
                 elif key == ord('q'):
                     break
             
-            cap.release()
             cv2.destroyAllWindows()
             
             if attendance_marked:
@@ -225,34 +670,34 @@ class FaceRecognitionSystem:
                 
         except Exception as e:
             return {"success": False, "message": f"Error marking attendance: {str(e)}"}
+        finally:
+            self.release_camera()
     
     def save_attendance(self, student_id, name):
         """Save attendance record"""
         try:
-            current_date = datetime.now().strftime('%Y-%m-%d')
-            current_time = datetime.now().strftime('%H:%M:%S')
-            
-            # Check if attendance already marked today
-            attendance_df = pd.read_csv(self.attendance_csv)
-            today_attendance = attendance_df[
-                (attendance_df['student_id'] == student_id) & 
-                (attendance_df['date'] == current_date)
-            ]
-            
-            if not today_attendance.empty:
-                return {"success": False, "message": f"Attendance already marked for {name} today"}
-            
-            # Add new attendance record
-            new_record = {
-                'student_id': student_id,
-                'name': name,
-                'date': current_date,
-                'time': current_time,
-                'status': 'Present'
-            }
-            
-            attendance_df = pd.concat([attendance_df, pd.DataFrame([new_record])], ignore_index=True)
-            attendance_df.to_csv(self.attendance_csv, index=False)
+            # One clock read so the date and time always belong to the same instant
+            now = datetime.now()
+            current_date = now.date().isoformat()
+            current_time = now.strftime('%H:%M:%S')
+            
+            with file_lock(self.attendance_csv):
+                # Check if attendance already marked today
+                self._refresh_if_stale()
+                with self._stats_lock:
+                    self._roll_over_day(current_date)
+                    already_marked = student_id in self._marked_today
+                
+                if already_marked:
+                    return {"success": False, "message": f"Attendance already marked for {name} today"}
+                
+                # Add new attendance record
+                append_csv_row(self.attendance_csv, [student_id, name, current_date, current_time, 'Present'])
+                
+                with self._stats_lock:
+                    self._marked_today.add(student_id)
+                    # Only the attendance file is locked here; a stale students part still forces a reload
+                    self._stats_signature = (self._stats_signature[0], self._file_signature(self.attendance_csv))
             
             return {"success": True, "message": f"Attendance marked for {name} at {current_time}"}
             
@@ -262,7 +707,7 @@ class FaceRecognitionSystem:
     def get_attendance_report(self, date=None):
         """Get attendance report for a specific date or all dates"""
         try:
-            attendance_df = pd.read_csv(self.attendance_csv)
+            attendance_df = pd.read_csv(self.attendance_csv, dtype=ATTENDANCE_DTYPES)
             
             if date:
                 attendance_df = attendance_df[attendance_df['date'] == date]
@@ -276,7 +721,7 @@ class FaceRecognitionSystem:
     def get_students_list(self):
         """Get list of all registered students"""
         try:
-            students_df = pd.read_csv(self.students_csv)
+            students_df = pd.read_csv(self.students_csv, dtype=STUDENT_DTYPES)
             return students_df.to_dict('records')
         except Exception as e:
             print(f"Error getting students list: {str(e)}")
@@ -310,8 +755,9 @@ if __name__ == "__main__":
                 print("Please enter a valid numeric Student ID")
         
         elif choice == '2':
+            rebuild = system.use_embeddings and input("Re-encode every student? (y/N): ").strip().lower() == 'y'
             print("Training model...")
-            result = system.train_model()
+            result = system.train_model(rebuild)
             print(result["message"])
         
         elif choice == '3':
@@ -343,6 +789,7 @@ if __name__ == "__main__":
                 print("No students registered")
         
         elif choice == '6':
+            system.release_camera()
             print("Goodbye!")
             break
         
@@ -11,30 +11,395 @@ import numpy as np
 from datetime import datetime
 import pickle
 import hashlib
+import hmac
 import getpass
+import json
+import logging
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from attendance_db import AttendanceDatabase
+
+try:
+    import numba
+except ImportError:  # Optional: JIT-compiled pixel comparison kernel
+    numba = None
+
+# Messages from the camera loops; set FACE_LOG_LEVEL=DEBUG to also see per-capture progress
+logger = logging.getLogger('face')
+logger.addHandler(logging.StreamHandler(sys.stdout))
+logger.propagate = False
+# Unknown level names fall back to INFO instead of failing the import
+log_level = logging.getLevelName(os.environ.get('FACE_LOG_LEVEL', 'INFO').upper())
+logger.setLevel(log_level if isinstance(log_level, int) else logging.INFO)
+
+# Side length of the stored training face crops
+FACE_SIZE = 200
+
+# Capture resolution requested from the webcam; faces of 100px and up are still found at ~1.5m
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+
+# Attendance runs the cascade and recognizer on every Nth frame and tracks the faces in between
+ATTENDANCE_DETECTION_INTERVAL = 4
+
+# LBPH distance at or below which a face counts as recognized (lower = more strict)
+LBPH_CONFIDENCE_THRESHOLD = 55
+
+# Existing face images scored per face_similarity_scores call; bounds the float temporaries
+SIMILARITY_BATCH_SIZE = 64
+
+# Derived per-folder caches live under here, so training folders (and their mtimes) only change with their images
+CACHE_FOLDER = os.path.join('models', 'cache')
+
+# Per-student cache of the arrays check_face_similarity compares
+DESCRIPTOR_CACHE_FILE = 'descriptors.npz'
+DESCRIPTOR_KEYS = ('face_300', 'face_200', 'face_100', 'hist_large', 'hist_medium', 'edges_200', 'gradmag_200')
+
+# Per-folder record of which images passed validate_face_in_image, keyed by file name and mtime
+FACE_VALIDATION_CACHE_FILE = 'valid.json'
+
+# Face chips preallocated per attendance frame; the buffer grows if a frame holds more
+MAX_FRAME_FACES = 8
+
+# Optional SFace embedding model from opencv_zoo; when it is in models/ it replaces LBPH for matching
+SFACE_MODEL_FILE = 'face_recognition_sface_2021dec.onnx'
+SFACE_INPUT_SIZE = 112
+# Cosine similarity above which SFace considers two faces the same person
+SFACE_COSINE_THRESHOLD = 0.363
+
+# Per-student array of all captured crops, read by train_model instead of the JPEGs
+FACE_TENSOR_FILE = 'faces.npy'
+
+# From OpenCV's data/lbpcascades folder; copy it into models/ if your build lacks it
+LBP_CASCADE_FILE = 'lbpcascade_frontalface_improved.xml'
+
+
+def read_grayscale_image(path):
+    """Decode one training image as grayscale, None if unreadable"""
+    return cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+
+
+def equalize_face(face):
+    """Histogram-equalize a grayscale face, including read-only memory-mapped ones"""
+    return cv2.equalizeHist(np.ascontiguousarray(face))
+
+
+def unit_centered_rows(images):
+    """Flatten each image (or vector) to a row, subtract its mean and scale it to unit length"""
+    # One float32 copy, centred and scaled in place; the row norms come from einsum without a squares temporary
+    rows = np.array(images, dtype=np.float32).reshape(len(images), -1)
+    rows -= rows.mean(axis=1, keepdims=True)
+    norms = np.sqrt(np.einsum('ij,ij->i', rows, rows))[:, None]
+    rows /= np.where(norms == 0, 1, norms)
+    return rows
+
+
+def gradient_magnitude(image):
+    """Sobel gradient magnitude of a grayscale image as float32"""
+    return cv2.magnitude(cv2.Sobel(image, cv2.CV_32F, 1, 0, ksize=3), cv2.Sobel(image, cv2.CV_32F, 0, 1, ksize=3))
+
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _pixel_moments(probe, stack):
+        """Pixel sum, sum of squares and dot product with probe of every image in stack, one image per core"""
+        moments = np.empty((stack.shape[0], 3), dtype=np.int64)
+        for i in numba.prange(stack.shape[0]):
+            total = 0
+            squares = 0
+            dot = 0
+            for y in range(probe.shape[0]):
+                for x in range(probe.shape[1]):
+                    value = np.int64(stack[i, y, x])
+                    total += value
+                    squares += value * value
+                    dot += value * np.int64(probe[y, x])
+            moments[i, 0] = total
+            moments[i, 1] = squares
+            moments[i, 2] = dot
+        return moments
+
+
+def pixel_scores(probe, stack):
+    """Size-equal NCC (TM_CCOEFF_NORMED) and mean squared difference of a uint8 probe against each image of stack
+    
+    With numba both follow from one fused pass of exact integer moments over
+    the stack; otherwise they are computed separately with NumPy.
+    """
+    num_pixels = probe.size
+    if numba is None:
+        ncc = unit_centered_rows(stack) @ unit_centered_rows(probe[None])[0]
+        # Stay in integers: int32 differences, squared sums accumulated in int64
+        diff = np.subtract(probe, stack, dtype=np.int32)
+        return ncc, np.square(diff).sum(axis=(1, 2), dtype=np.int64) / num_pixels
+    
+    probe_sum = float(probe.sum(dtype=np.int64))
+    probe_squares = float(np.square(probe, dtype=np.int64).sum())
+    moments = _pixel_moments(np.ascontiguousarray(probe), np.ascontiguousarray(stack))
+    sums, squares, dots = moments.T.astype(np.float64)
+    
+    covariance = num_pixels * dots - sums * probe_sum
+    variance = (num_pixels * squares - sums ** 2) * (num_pixels * probe_squares - probe_sum ** 2)
+    ncc = covariance / np.sqrt(np.where(variance == 0, 1, variance))
+    return ncc, (squares - 2 * dots + probe_squares) / num_pixels
+
+
+class FrameReader:
+    """Reads camera frames on a background thread, keeping only the newest one
+    
+    cap.read() blocks while the next frame is transferred from the camera, so
+    reading on a separate thread overlaps that wait with detection and display.
+    """
+    
+    def __init__(self, cap):
+        self.cap = cap
+        self.frames = queue.Queue(maxsize=1)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def run(self):
+        """Producer loop: replace any unread frame so the consumer never sees a stale one"""
+        while not self.stopped.is_set():
+            ret, frame = self.cap.read()
+            if not ret:
+                frame = None  # Tells the consumer the camera stopped delivering
+            try:
+                self.frames.put_nowait(frame)
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                except queue.Empty:
+                    pass
+                self.frames.put_nowait(frame)
+            if frame is None:
+                break
+    
+    def read(self, timeout=5.0):
+        """Return (ret, frame) for the newest frame, like cv2.VideoCapture.read"""
+        try:
+            frame = self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return False, None
+        return frame is not None, frame
+    
+    def stop(self):
+        """Stop the reader thread; call before releasing the camera"""
+        self.stopped.set()
+        self.thread.join(timeout=1.0)
+
+
+class TextOverlay:
+    """Fixed text rendered once and copied onto every frame
+    
+    cv2.putText rasterizes the glyphs on every call; copying the already
+    drawn pixels is much cheaper. The text is re-rendered only if the frame
+    size changes.
+    """
+    
+    def __init__(self, text, org, font_scale, color):
+        self.text = text
+        self.org = org
+        self.font_scale = font_scale
+        self.color = color
+        self.shape = None
+    
+    def render(self, shape):
+        # Draw the text once as a coverage mask; OpenCV builds that anti-alias it get thresholded at 50%
+        coverage = np.zeros(shape[:2], dtype=np.uint8)
+        cv2.putText(coverage, self.text, self.org, cv2.FONT_HERSHEY_SIMPLEX, self.font_scale, 255, 2)
+        mask = coverage >= 128
+        
+        # Keep only the bounding box of the text so each copy touches as few pixels as possible
+        rows, cols = np.nonzero(mask)
+        if len(rows) == 0:
+            self.roi = (slice(0, 0), slice(0, 0))
+        else:
+            self.roi = (slice(rows.min(), rows.max() + 1), slice(cols.min(), cols.max() + 1))
+        self.mask = mask[self.roi].astype(np.uint8)
+        self.pixels = np.full(self.mask.shape + (3,), self.color, dtype=np.uint8)
+        self.shape = shape
+    
+    def draw(self, frame):
+        if frame.shape != self.shape:
+            self.render(frame.shape)
+        cv2.copyTo(self.pixels, self.mask, frame[self.roi])
+
 
 class WindowsFaceRecognition:
     def __init__(self):
         # File paths
         self.students_csv = "data/students.csv"
         self.attendance_csv = "data/attendance.csv"
+        self.database_file = "data/attendance.db"
         self.training_folder = "training_images"
         self.model_file = "models/trained_model.yml"
+        self.embeddings_file = "models/sface_embeddings.npy"
+        self.embedding_ids_file = "models/sface_embedding_ids.npy"
+        self.trained_ids_file = "models/trained_ids.txt"
         self.admin_file = "data/admin_config.txt"
         
         # Create directories
         self.create_directories()
         
         # Initialize face detection and recognition
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        self.face_cascade = self.load_face_cascade()
+        self._thread_local = threading.local()
+        # Folder path -> {file name: [mtime, is valid]}, loaded from FACE_VALIDATION_CACHE_FILE on demand
+        self._face_valid_cache = {}
+        # Folders whose validation results changed since their valid.json was last written
+        self._face_valid_dirty = set()
+        # Similarity checks validate several students' folders on a thread pool
+        self._face_valid_lock = threading.Lock()
         self.recognizer = cv2.face.LBPHFaceRecognizer_create()
         
+        # Match with SFace embeddings when the ONNX model has been downloaded; LBPH cost grows with every training image
+        sface_path = os.path.join("models", SFACE_MODEL_FILE)
+        self.face_embedder = cv2.FaceRecognizerSF.create(sface_path, "") if os.path.exists(sface_path) else None
+        self._embeddings = None
+        self._embedding_ids = None
+        self._embeddings_mtime = None
+        
+        # Keep OpenCV's SIMD (IPP) paths on and let detectMultiScale spread over all
+        # cores but one, which is left for the FrameReader thread
+        cv2.setUseOptimized(True)
+        cv2.setNumThreads(max(1, (os.cpu_count() or 2) - 1))
+        
+        # Run grayscale conversion and resizing through OpenCL when a device is available
+        self.use_opencl = cv2.ocl.haveOpenCL()
+        cv2.ocl.setUseOpenCL(self.use_opencl)
+        # Reused by to_detection_gray and detect_faces_half_res; only valid until the next frame
+        self._gray_buffer = None
+        self._small_buffer = None
+        self._crop_buffer = np.empty((FACE_SIZE, FACE_SIZE), dtype=np.uint8)
+        
+        # Fixed on-screen text, pre-rendered so the camera loops only draw what changes
+        self._capture_keys_overlay = TextOverlay('SPACEBAR: Capture | ESC: Cancel', (10, 70), 0.6, (255, 255, 255))
+        self._face_ready_overlay = TextOverlay('Face Ready - Press SPACEBAR', (10, 110), 0.6, (0, 255, 0))
+        self._no_face_overlay = TextOverlay('No Face Detected', (10, 110), 0.6, (0, 0, 255))
+        self._quit_overlay = TextOverlay('Press Q to quit', (10, 60), 0.7, (255, 255, 255))
+        self._camera_test_overlay = TextOverlay('Camera Test - Press any key to exit', (10, 30), 0.7, (0, 255, 0))
+        self._ready_to_capture_overlay = TextOverlay('READY TO CAPTURE - Press SPACEBAR', (10, 110), 0.6, (0, 255, 0))
+        self._no_valid_face_overlay = TextOverlay('No Face Detected', (10, 150), 0.7, (0, 0, 255))
+        self._multiple_faces_overlay = TextOverlay('Multiple Faces - Please ensure only one person', (10, 150), 0.6, (0, 0, 255))
+        
+        # Webcam kept open between menu picks; opening it can take over a second
+        self.cap = None
+        
+        # Trained model and students table cached between sessions, keyed by file mtime
+        self._model_mtime = None
+        self._students_df = None
+        self._students_mtime = None
+        self._student_names = {}
+        
         # Create CSV files and admin config
         self.create_csv_files()
         self.setup_admin_password()
         
+        # Indexed store for students and attendance, shared with the advanced system
+        # (imports the existing CSV data on first run)
+        self.db = AttendanceDatabase(self.database_file, self.students_csv, self.attendance_csv)
+        
         print("✅ Face Recognition System initialized successfully!")
     
+    def load_face_cascade(self):
+        """Load the LBP face cascade, falling back to the Haar cascade if it is missing
+        
+        LBP features are integer comparisons, so detection runs 2-3x faster
+        than Haar with similar accuracy for frontal faces.
+        """
+        # pip builds of OpenCV only bundle the Haar files, so also look in models/
+        for path in (os.path.join("models", LBP_CASCADE_FILE), cv2.data.haarcascades + LBP_CASCADE_FILE):
+            if os.path.exists(path):
+                cascade = cv2.CascadeClassifier(path)
+                if not cascade.empty():
+                    return cascade
+        
+        return cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    
+    def thread_face_cascade(self):
+        """Return a face cascade owned by the calling thread
+        
+        One CascadeClassifier must not run concurrent detections, so worker
+        threads each load their own; the main thread uses self.face_cascade.
+        """
+        if threading.current_thread() is threading.main_thread():
+            return self.face_cascade
+        cascade = getattr(self._thread_local, 'face_cascade', None)
+        if cascade is None:
+            cascade = self._thread_local.face_cascade = self.load_face_cascade()
+        return cascade
+    
+    def to_detection_gray(self, frame):
+        """Convert a camera frame to grayscale, on the OpenCL device when available"""
+        if self.use_opencl:
+            return cv2.cvtColor(cv2.UMat(frame), cv2.COLOR_BGR2GRAY)
+        
+        # Convert into the same buffer every frame instead of allocating a new image
+        if self._gray_buffer is None or self._gray_buffer.shape != frame.shape[:2]:
+            self._gray_buffer = np.empty(frame.shape[:2], dtype=np.uint8)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray_buffer)
+    
+    def download_gray(self, gray):
+        """Return a grayscale frame from to_detection_gray as a numpy array"""
+        return gray.get() if isinstance(gray, cv2.UMat) else gray
+    
+    def detect_faces_half_res(self, gray, scale_factor, min_neighbors, min_size):
+        """Detect faces on a half-resolution copy of gray and return full-resolution boxes
+        
+        Halving both axes quarters the pixels the cascade scans at every stage.
+        Small or distant faces are lost a little sooner, so min_size (given in
+        full-resolution pixels) should stay at 100 or above.
+        """
+        if isinstance(gray, cv2.UMat):
+            small = cv2.resize(gray, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+        else:
+            # Downscale into the same buffer every frame, like the grayscale conversion
+            height, width = gray.shape[0] // 2, gray.shape[1] // 2
+            if self._small_buffer is None or self._small_buffer.shape != (height, width):
+                self._small_buffer = np.empty((height, width), dtype=np.uint8)
+            small = cv2.resize(gray, (width, height), dst=self._small_buffer, interpolation=cv2.INTER_AREA)
+        # Color conversion and resize run on the OpenCL device, but the cascade's OpenCL path is
+        # unreliable on several drivers, so detect on the CPU after downloading the quarter-size image
+        small = self.download_gray(small)
+        faces = self.face_cascade.detectMultiScale(small, scaleFactor=scale_factor, minNeighbors=min_neighbors,
+                                                   minSize=(min_size[0] // 2, min_size[1] // 2))
+        return np.asarray(faces, dtype=np.int32).reshape(-1, 4) * 2
+    
+    def start_face_trackers(self, frame, faces):
+        """One KCF tracker per face box; empty if this OpenCV build lacks KCF, so the boxes are just reused"""
+        if not hasattr(cv2, 'TrackerKCF_create'):
+            return []
+        trackers = []
+        for box in faces:
+            tracker = cv2.TrackerKCF_create()
+            tracker.init(frame, tuple(int(v) for v in box))
+            trackers.append(tracker)
+        return trackers
+    
+    def get_camera(self):
+        """Return the shared webcam, opening and configuring it only if it is not open yet"""
+        if self.cap is None or not self.cap.isOpened():
+            # DirectShow opens much faster than the default MSMF backend on Windows
+            self.cap = cv2.VideoCapture(0, cv2.CAP_DSHOW) if os.name == 'nt' else cv2.VideoCapture(0)
+            # MJPG needs far less USB bandwidth than raw YUYV, so the camera keeps its full frame rate
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+            self.cap.set(cv2.CAP_PROP_FPS, 30)
+            # Smaller frames mean less to transfer, decode and scan on every read
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
+        return self.cap
+    
+    def close(self):
+        """Release the shared webcam"""
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+    
     def create_directories(self):
         """Create necessary directories"""
         directories = ["data", "training_images", "models", "temp_captures"]
@@ -167,20 +532,20 @@ class WindowsFaceRecognition:
             # All security checks passed - Save student data
             print("\n💾 Saving student data...")
             
-            try:
-                students_df = pd.read_csv(self.students_csv)
-            except:
-                students_df = pd.DataFrame(columns=['student_id', 'name', 'email', 'registration_date'])
-            
-            new_student = pd.DataFrame({
-                'student_id': [student_id],
-                'name': [name],
-                'email': [email],
-                'registration_date': [datetime.now().strftime('%Y-%m-%d %H:%M:%S')]
-            })
+            # Appended to the students CSV under its lock; another process may have taken the ID meanwhile
+            registration_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            if not self.db.add_student(int(student_id), name, email, registration_date):
+                print(f"❌ Student ID {student_id} was registered by another session meanwhile!")
+                return False
+            # Drop the cached roster even if the filesystem's mtime resolution hides the write
+            self._students_df = None
             
-            students_df = pd.concat([students_df, new_student], ignore_index=True)
-            students_df.to_csv(self.students_csv, index=False)
+            # Precompute the new student's similarity descriptors so later registrations only load them
+            try:
+                self.build_reference_cache(student_id)
+                self.save_face_valid_caches()
+            except Exception as e:
+                print(f"⚠️ Could not cache face descriptors: {e}")
             
             print(f"✅ Student {name} registered successfully!")
             print("🔐 All security checks passed")
@@ -198,8 +563,9 @@ class WindowsFaceRecognition:
     
     def capture_faces(self, student_id, save_dir, target_images=25):
         """Capture face images for training"""
-        cap = cv2.VideoCapture(0)
+        cap = self.get_camera()
         count = 0
+        captured_faces = np.empty((target_images, FACE_SIZE, FACE_SIZE), dtype=np.uint8)
         
         print(f"📸 Capturing face images for Student ID: {student_id}")
         print("📋 Instructions:")
@@ -213,15 +579,18 @@ class WindowsFaceRecognition:
             print("❌ Cannot access camera!")
             return False
         
+        # Read frames on a background thread so camera I/O overlaps processing
+        reader = FrameReader(cap)
+        
         while count < target_images:
-            ret, frame = cap.read()
+            ret, frame = reader.read()
             if not ret:
-                print("❌ Cannot read from camera!")
+                logger.error("❌ Cannot read from camera!")
                 break
             
             # Convert to grayscale
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5, minSize=(100, 100))
+            gray = self.to_detection_gray(frame)
+            faces = self.detect_faces_half_res(gray, 1.3, 5, (100, 100))
             
             # Draw rectangles around detected faces
             for (x, y, w, h) in faces:
@@ -232,15 +601,12 @@ class WindowsFaceRecognition:
             # Display progress and instructions
             cv2.putText(frame, f'Images Captured: {count}/{target_images}', (10, 30), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-            cv2.putText(frame, 'SPACEBAR: Capture | ESC: Cancel', (10, 70), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            self._capture_keys_overlay.draw(frame)
             
             if len(faces) > 0:
-                cv2.putText(frame, 'Face Ready - Press SPACEBAR', (10, 110), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                self._face_ready_overlay.draw(frame)
             else:
-                cv2.putText(frame, 'No Face Detected', (10, 110), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+                self._no_face_overlay.draw(frame)
             
             cv2.imshow('Face Capture', frame)
             
@@ -248,42 +614,53 @@ class WindowsFaceRecognition:
             if key == 32:  # SPACEBAR
                 if len(faces) > 0:
                     # Save the largest detected face
-                    largest_face = max(faces, key=lambda face: face[2] * face[3])
-                    x, y, w, h = largest_face
-                    
-                    # Extract face region
-                    face_img = gray[y:y+h, x:x+w]
+                    # faces is an (N, 4) int32 array, so pick by area in one vectorized argmax
+                    x, y, w, h = faces[np.argmax(faces[:, 2] * faces[:, 3])]
                     
-                    # Resize to standard size for better recognition
-                    face_img = cv2.resize(face_img, (200, 200))
+                    # Extract face region; only download the frame when a capture is taken
+                    face_img = self.download_gray(gray)[y:y+h, x:x+w]
                     
-                    # Save image
-                    filename = os.path.join(save_dir, f'{student_id}_{count:03d}.jpg')
-                    cv2.imwrite(filename, face_img)
+                    # Resize to standard size and equalize contrast, as enhanced capture does,
+                    # equalizing straight into the face tensor row
+                    cv2.resize(face_img, (FACE_SIZE, FACE_SIZE), dst=self._crop_buffer)
+                    cv2.equalizeHist(self._crop_buffer, dst=captured_faces[count])
                     count += 1
                     
-                    print(f"📸 Captured image {count}/{target_images}")
+                    logger.debug(f"📸 Captured image {count}/{target_images}")
                     
                     # Brief pause to prevent multiple captures
                     cv2.waitKey(500)
                 else:
-                    print("⚠️  No face detected! Please position your face properly.")
+                    logger.info("⚠️  No face detected! Please position your face properly.")
                     
             elif key == 27:  # ESC key
                 print("❌ Capture cancelled by user")
                 break
         
-        cap.release()
+        reader.stop()
         cv2.destroyAllWindows()
         
         success = count >= 15  # Minimum 15 images required
         if success:
+            self.save_captured_faces(student_id, save_dir, captured_faces[:count])
             print(f"✅ Successfully captured {count} images!")
         else:
             print(f"❌ Only captured {count} images. Minimum 15 required.")
         
         return success
     
+    def save_captured_faces(self, student_id, save_dir, captured_faces, jpeg_params=()):
+        """Write a finished capture: one (N, FACE_SIZE, FACE_SIZE) uint8 .npy plus a JPEG per face
+        
+        train_model reads only the tensor; the JPEGs are still written for the
+        similarity check and reports, encoded together on a thread pool once the
+        capture succeeds instead of one at a time inside the camera loop.
+        """
+        np.save(os.path.join(save_dir, FACE_TENSOR_FILE), captured_faces)
+        filenames = [os.path.join(save_dir, f'{student_id}_{i:03d}.jpg') for i in range(len(captured_faces))]
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            list(pool.map(lambda path, face: cv2.imwrite(path, face, list(jpeg_params)), filenames, captured_faces))
+    
     def train_model(self):
         """Train the face recognition model"""
         print("\n🔄 Training face recognition model...")
@@ -297,46 +674,100 @@ class WindowsFaceRecognition:
             print("❌ No training images found!")
             return False
         
-        # Load training images
-        for student_folder in os.listdir(self.training_folder):
-            if not student_folder.isdigit():
-                continue
-                
-            student_id = int(student_folder)
-            folder_path = os.path.join(self.training_folder, student_folder)
-            
-            if not os.path.isdir(folder_path):
+        # scandir returns the file type with each entry, so no extra stat call per folder or image
+        student_folders = {int(entry.name): entry.path for entry in os.scandir(self.training_folder)
+                           if entry.name.isdigit() and entry.is_dir()}
+        
+        # LBPH can learn new students without retraining the old ones, but cannot forget any,
+        # so only update when students were added and none were removed since the last training
+        trained_ids = self.load_trained_ids()
+        new_ids = student_folders.keys() - trained_ids
+        incremental = (bool(trained_ids) and bool(new_ids) and trained_ids <= student_folders.keys()
+                       and os.path.exists(self.model_file)
+                       and (self.face_embedder is None or os.path.exists(self.embeddings_file)))
+        if incremental:
+            print(f"➕ Updating the existing model with {len(new_ids)} new students")
+            student_folders = {student_id: student_folders[student_id] for student_id in new_ids}
+        
+        # Collect training image paths
+        image_paths = []
+        image_ids = []
+        for student_id, folder_path in sorted(student_folders.items()):
+            # Students captured with a face tensor load as memory-mapped views, no JPEG decode
+            tensor_path = os.path.join(folder_path, FACE_TENSOR_FILE)
+            if os.path.exists(tensor_path):
+                face_tensor = np.load(tensor_path, mmap_mode='r')
+                faces.extend(face_tensor)
+                labels.extend([student_id] * len(face_tensor))
+                student_count += 1
+                print(f"📁 Loaded {len(face_tensor)} images for Student ID: {student_id}")
                 continue
             
-            image_count = 0
-            for image_file in os.listdir(folder_path):
-                if image_file.lower().endswith(('.jpg', '.jpeg', '.png')):
-                    image_path = os.path.join(folder_path, image_file)
-                    
-                    # Load image in grayscale
-                    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-                    if img is not None:
-                        faces.append(img)
-                        labels.append(student_id)
-                        image_count += 1
-            
-            if image_count > 0:
-                student_count += 1
-                print(f"📁 Loaded {image_count} images for Student ID: {student_id}")
+            for image_entry in os.scandir(folder_path):
+                if image_entry.name.lower().endswith(('.jpg', '.jpeg', '.png')) and image_entry.is_file():
+                    image_paths.append(image_entry.path)
+                    image_ids.append(student_id)
+        
+        # OpenCV releases the GIL, so JPEG decoding and equalization run on all cores
+        executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+        
+        # Load images in grayscale
+        images = executor.map(read_grayscale_image, image_paths)
+        
+        image_counts = {}
+        for img, student_id in zip(images, image_ids):
+            if img is not None:
+                faces.append(img)
+                labels.append(student_id)
+                image_counts[student_id] = image_counts.get(student_id, 0) + 1
+        
+        for student_id, image_count in image_counts.items():
+            student_count += 1
+            print(f"📁 Loaded {image_count} images for Student ID: {student_id}")
         
         if len(faces) == 0:
+            executor.shutdown()
             print("❌ No training images found!")
             return False
         
+        # Equalize every face the same way recognition does; images saved before capture equalized need it
+        with executor:
+            faces = list(executor.map(equalize_face, faces))
+        
         # Train the model
         print(f"🎯 Training model with {len(faces)} images from {student_count} students...")
         
         try:
-            self.recognizer.train(faces, np.array(labels))
+            if incremental:
+                self.load_model()
+                self.recognizer.update(faces, np.asarray(labels, dtype=np.int32))
+            else:
+                self.recognizer.train(faces, np.asarray(labels, dtype=np.int32))
             
             # Save the model
             os.makedirs("models", exist_ok=True)
             self.recognizer.save(self.model_file)
+            # The recognizer already holds what was just saved
+            self._model_mtime = os.path.getmtime(self.model_file)
+            
+            if self.face_embedder is not None:
+                print("🧬 Computing SFace embeddings...")
+                image_embeddings = np.vstack([self.face_embedding(face) for face in faces])
+                # Keep one unit-length mean embedding per student, so matching is a single
+                # (students x 128) product no matter how many images each student has
+                embedding_ids, rows = np.unique(np.asarray(labels, dtype=np.int32), return_inverse=True)
+                centroids = np.zeros((len(embedding_ids), image_embeddings.shape[1]), dtype=np.float64)
+                np.add.at(centroids, rows, image_embeddings)
+                embeddings = (centroids / np.linalg.norm(centroids, axis=1, keepdims=True)).astype(np.float32)
+                if incremental:
+                    embeddings = np.vstack([self._embeddings, embeddings])
+                    embedding_ids = np.concatenate([self._embedding_ids, embedding_ids])
+                self._embeddings, self._embedding_ids = embeddings, embedding_ids
+                np.save(self.embeddings_file, self._embeddings)
+                np.save(self.embedding_ids_file, self._embedding_ids)
+                self._embeddings_mtime = os.path.getmtime(self.embeddings_file)
+            
+            self.save_trained_ids((trained_ids if incremental else set()) | set(labels))
             
             print("✅ Model trained and saved successfully!")
             print(f"📊 Training completed: {len(faces)} images, {student_count} students")
@@ -358,7 +789,7 @@ class WindowsFaceRecognition:
         
         # Load the trained model
         try:
-            self.recognizer.read(self.model_file)
+            self.load_model()
             print("✅ Model loaded successfully")
         except Exception as e:
             print(f"❌ Error loading model: {str(e)}")
@@ -366,17 +797,18 @@ class WindowsFaceRecognition:
         
         # Load student data
         try:
-            students_df = pd.read_csv(self.students_csv)
+            students_df = self.load_students_df()
             if students_df.empty:
                 print("❌ No students registered!")
                 return
             print(f"📚 Loaded {len(students_df)} registered students")
+            id_to_name = self.load_student_names()
         except:
             print("❌ No students registered!")
             return
         
         # Start camera
-        cap = cv2.VideoCapture(0)
+        cap = self.get_camera()
         if not cap.isOpened():
             print("❌ Cannot access camera!")
             return
@@ -387,43 +819,80 @@ class WindowsFaceRecognition:
         print("   ⏰ Attendance will be marked automatically when recognized")
         print("   ❌ Press 'Q' to quit")
         
-        marked_today = set()
+        # Start from today's existing records so earlier sessions' marks show as already marked
+        today = datetime.now().strftime('%Y-%m-%d')
+        marked_today = self.load_marked_today(today)
         recognition_frames = 0
         required_frames = 5  # Number of consecutive frames required for recognition
         last_recognized = None
-        confidence_threshold = 70  # Adjust this value for sensitivity (lower = more strict)
+        confidence_threshold = self.confidence_threshold  # Lower = more strict
+        
+        # Read frames on a background thread so camera I/O overlaps processing
+        reader = FrameReader(cap)
+        
+        # LBPH predict releases the GIL, so several faces in one frame are matched in parallel
+        predict_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+        
+        frame_index = 0
+        faces = []
+        results = []
+        trackers = []
+        face_buf = np.empty((MAX_FRAME_FACES, FACE_SIZE, FACE_SIZE), np.uint8)
         
         while True:
-            ret, frame = cap.read()
+            ret, frame = reader.read()
             if not ret:
-                print("❌ Cannot read from camera!")
+                logger.error("❌ Cannot read from camera!")
                 break
             
-            # Convert to grayscale
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5, minSize=(100, 100))
+            # Detect and recognize on every Nth frame; in between, KCF trackers follow the
+            # faces and each keeps the identity predicted when it was detected
+            fresh = frame_index % ATTENDANCE_DETECTION_INTERVAL == 0
+            frame_index += 1
+            
+            if fresh:
+                # Convert to grayscale
+                gray = self.to_detection_gray(frame)
+                faces = self.detect_faces_half_res(gray, 1.3, 5, (100, 100))
+                trackers = self.start_face_trackers(frame, faces)
+            elif trackers:
+                tracked = [tracker.update(frame) for tracker in trackers]
+                # A lost face disappears until the next detection
+                keep = [i for i, (ok, _) in enumerate(tracked) if ok]
+                faces = np.array([tracked[i][1] for i in keep], dtype=np.int32).reshape(-1, 4)
+                trackers = [trackers[i] for i in keep]
+                results = [results[i] for i in keep]
             
             current_recognition = None
+            if fresh:
+                results = []
+            if fresh and len(faces) > 0:
+                gray = self.download_gray(gray)
+                
+                # Extract, resize and equalize faces straight into the preallocated chips
+                if len(faces) > len(face_buf):
+                    face_buf = np.empty((len(faces), FACE_SIZE, FACE_SIZE), np.uint8)
+                for i, (x, y, w, h) in enumerate(faces):
+                    cv2.resize(gray[y:y+h, x:x+w], (FACE_SIZE, FACE_SIZE), dst=face_buf[i])
+                    cv2.equalizeHist(face_buf[i], dst=face_buf[i])
+                
+                # Recognize faces
+                results = self.predict_faces(face_buf[:len(faces)], predict_pool)
             
-            for (x, y, w, h) in faces:
+            # Threshold and score all faces of the frame in one go; the loop below only looks up and draws
+            distances = np.array([confidence for _, confidence in results], dtype=np.float64)
+            confident = distances <= confidence_threshold
+            accuracies = np.round(100 - distances, 1)
+            
+            for (x, y, w, h), (student_id, _), is_confident, accuracy in zip(faces, results, confident, accuracies):
                 # Draw rectangle around face
                 cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
                 
-                # Extract and resize face
-                face_region = gray[y:y+h, x:x+w]
-                face_region = cv2.resize(face_region, (200, 200))
-                
-                # Recognize face
-                student_id, confidence = self.recognizer.predict(face_region)
-                
                 # Check if recognition is confident enough
-                if confidence <= confidence_threshold:
+                if is_confident:
                     # Find student info
-                    student_info = students_df[students_df['student_id'] == student_id]
-                    if not student_info.empty:
-                        name = student_info.iloc[0]['name']
-                        accuracy = round(100 - confidence, 1)
-                        
+                    name = id_to_name.get(student_id)
+                    if name is not None:
                         # Display recognition info
                         cv2.putText(frame, f'{name}', (x, y-40), 
                                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
@@ -447,18 +916,24 @@ class WindowsFaceRecognition:
                 else:
                     cv2.putText(frame, 'Unknown Person', (x, y-10), 
                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-                    cv2.putText(frame, f'Low Confidence: {round(100-confidence, 1)}%', (x, y+h+25), 
+                    cv2.putText(frame, f'Low Confidence: {accuracy}%', (x, y+h+25), 
                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
             
             # Handle consecutive frame recognition
             if current_recognition and current_recognition == last_recognized:
-                recognition_frames += 1
+                # Only frames that were actually recognized count towards the required streak
+                if fresh:
+                    recognition_frames += 1
                 if recognition_frames >= required_frames:
                     student_id, name = current_recognition
                     if student_id not in marked_today:
                         if self.save_attendance_record(student_id, name):
                             marked_today.add(student_id)
-                            print(f"✅ Attendance marked for {name} (ID: {student_id})")
+                            logger.info(f"✅ Attendance marked for {name} (ID: {student_id})")
+                        else:
+                            # Marked meanwhile by another session; pick up its records so the
+                            # set check stops this student from reaching the database again
+                            marked_today.update(self.load_marked_today(today))
                         recognition_frames = 0
             else:
                 recognition_frames = 0
@@ -467,8 +942,7 @@ class WindowsFaceRecognition:
             # Display system info
             cv2.putText(frame, f'Marked Today: {len(marked_today)}', (10, 30), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            cv2.putText(frame, 'Press Q to quit', (10, 60), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            self._quit_overlay.draw(frame)
             
             if current_recognition and current_recognition[0] not in marked_today:
                 cv2.putText(frame, f'Recognition Progress: {recognition_frames}/{required_frames}', (10, 90), 
@@ -481,7 +955,8 @@ class WindowsFaceRecognition:
             if key == ord('q') or key == ord('Q'):
                 break
         
-        cap.release()
+        reader.stop()
+        predict_pool.shutdown()
         cv2.destroyAllWindows()
         
         print(f"\n📊 Attendance session completed!")
@@ -490,45 +965,98 @@ class WindowsFaceRecognition:
         if len(marked_today) > 0:
             print("👥 Students marked present:")
             for student_id in marked_today:
-                student_info = students_df[students_df['student_id'] == student_id]
-                if not student_info.empty:
-                    name = student_info.iloc[0]['name']
+                name = id_to_name.get(student_id)
+                if name is not None:
                     print(f"   • {name} (ID: {student_id})")
     
+    def load_trained_ids(self):
+        """Return the set of student IDs the saved model was trained on, empty if unknown"""
+        try:
+            with open(self.trained_ids_file, 'r') as f:
+                return {int(line) for line in f if line.strip()}
+        except (OSError, ValueError):
+            return set()
+    
+    def save_trained_ids(self, student_ids):
+        """Record which student IDs the saved model was trained on"""
+        with open(self.trained_ids_file, 'w') as f:
+            f.writelines(f"{student_id}\n" for student_id in sorted(student_ids))
+    
+    def load_model(self):
+        """Read the trained model, skipping the read if the file is unchanged since the last one"""
+        mtime = os.path.getmtime(self.model_file)
+        if mtime != self._model_mtime:
+            self.recognizer.read(self.model_file)
+            self._model_mtime = mtime
+        
+        # Embeddings are only written when SFace was available at training time
+        if self.face_embedder is not None and os.path.exists(self.embeddings_file):
+            mtime = os.path.getmtime(self.embeddings_file)
+            if mtime != self._embeddings_mtime:
+                self._embeddings = np.load(self.embeddings_file)
+                self._embedding_ids = np.load(self.embedding_ids_file)
+                self._embeddings_mtime = mtime
+    
+    @property
+    def confidence_threshold(self):
+        """Largest predict_faces distance that still counts as a match"""
+        if self._embeddings is not None:
+            return (1 - SFACE_COSINE_THRESHOLD) * 100
+        return LBPH_CONFIDENCE_THRESHOLD
+    
+    def face_embedding(self, face):
+        """Unit-length SFace embedding of a grayscale face crop"""
+        face_bgr = cv2.cvtColor(cv2.resize(face, (SFACE_INPUT_SIZE, SFACE_INPUT_SIZE)), cv2.COLOR_GRAY2BGR)
+        embedding = self.face_embedder.feature(face_bgr).ravel()
+        return embedding / np.linalg.norm(embedding)
+    
+    def predict_faces(self, crops, executor=None):
+        """Return (student_id, distance) for each face crop, lower distance meaning a closer match
+        
+        With SFace embeddings the distance is 100 * (1 - cosine similarity), so
+        100 - distance reads as a match percentage just like the LBPH distance.
+        All crops are scored against every student's mean embedding in one matrix product.
+        """
+        if self._embeddings is not None:
+            queries = np.vstack([self.face_embedding(crop) for crop in crops])
+            similarities = queries @ self._embeddings.T
+            best = similarities.argmax(axis=1)
+            return [(int(self._embedding_ids[i]), float(100 * (1 - similarities[row, i])))
+                    for row, i in enumerate(best)]
+        
+        # Several LBPH faces share the caller's thread pool
+        if executor is None or len(crops) == 1:
+            return [self.recognizer.predict(crop) for crop in crops]
+        return list(executor.map(self.recognizer.predict, crops))
+    
+    def load_students_df(self):
+        """Return the students table, re-reading the CSV only when it changed on disk"""
+        mtime = os.path.getmtime(self.students_csv)
+        if self._students_df is None or mtime != self._students_mtime:
+            self._students_df = pd.read_csv(self.students_csv)
+            self._students_mtime = mtime
+            self._student_names = dict(zip(self._students_df['student_id'], self._students_df['name']))
+        return self._students_df
+    
+    def load_student_names(self):
+        """Return the cached student_id -> name dict, refreshed along with the students table"""
+        self.load_students_df()
+        return self._student_names
+    
+    def load_marked_today(self, current_date):
+        """Return the set of IDs marked present on current_date, an indexed query on the synced database"""
+        return {record['student_id'] for record in self.db.get_attendance(current_date)}
+    
     def save_attendance_record(self, student_id, name):
-        """Save attendance record to CSV"""
+        """Append an attendance record to the attendance CSV unless already marked today"""
         try:
-            current_date = datetime.now().strftime('%Y-%m-%d')
-            current_time = datetime.now().strftime('%H:%M:%S')
+            # One clock read so the date and time always belong to the same instant
+            now = datetime.now()
+            current_date = now.strftime('%Y-%m-%d')
+            current_time = now.strftime('%H:%M:%S')
             
-            # Load existing attendance
-            try:
-                attendance_df = pd.read_csv(self.attendance_csv)
-            except:
-                attendance_df = pd.DataFrame(columns=['student_id', 'name', 'date', 'time', 'status'])
-            
-            # Check if already marked today
-            today_records = attendance_df[
-                (attendance_df['student_id'] == student_id) & 
-                (attendance_df['date'] == current_date)
-            ]
-            
-            if not today_records.empty:
-                return False  # Already marked
-            
-            # Add new record
-            new_record = pd.DataFrame({
-                'student_id': [student_id],
-                'name': [name],
-                'date': [current_date],
-                'time': [current_time],
-                'status': ['Present']
-            })
-            
-            attendance_df = pd.concat([attendance_df, new_record], ignore_index=True)
-            attendance_df.to_csv(self.attendance_csv, index=False)
-            
-            return True
+            # Checked against the synced database under the CSV's lock, so every writer sees every mark
+            return self.db.add_attendance(int(student_id), name, current_date, current_time)
             
         except Exception as e:
             print(f"❌ Error saving attendance: {e}")
@@ -537,38 +1065,42 @@ class WindowsFaceRecognition:
     def show_attendance_report(self, date=None):
         """Display attendance report"""
         try:
-            attendance_df = pd.read_csv(self.attendance_csv)
-            
-            if attendance_df.empty:
-                print("📭 No attendance records found!")
-                return
-            
-            if date:
-                attendance_df = attendance_df[attendance_df['date'] == date]
-                print(f"\n📊 Attendance Report for {date}")
-            else:
-                print("\n📊 Complete Attendance Report")
-            
-            if attendance_df.empty:
-                print("📭 No records found for the specified date!")
-                return
-            
-            print("=" * 80)
-            print(f"{'ID':<8} {'Name':<20} {'Date':<12} {'Time':<10} {'Status':<10}")
-            print("=" * 80)
-            
-            for _, record in attendance_df.iterrows():
+            total_records = 0
+            unique_students = set()
+            unique_dates = set()
+            
+            # Rows stream from an indexed query, so the report never holds the whole table
+            for record in self.db.iter_attendance(date):
+                if total_records == 0:
+                    if date:
+                        print(f"\n📊 Attendance Report for {date}")
+                    else:
+                        print("\n📊 Complete Attendance Report")
+                    print("=" * 80)
+                    print(f"{'ID':<8} {'Name':<20} {'Date':<12} {'Time':<10} {'Status':<10}")
+                    print("=" * 80)
+                
                 print(f"{record['student_id']:<8} {record['name']:<20} {record['date']:<12} {record['time']:<10} {record['status']:<10}")
+                total_records += 1
+                # Statistics are only shown when listing all records
+                if date is None:
+                    unique_students.add(record['student_id'])
+                    unique_dates.add(record['date'])
+            
+            if total_records == 0:
+                if date:
+                    print("📭 No records found for the specified date!")
+                else:
+                    print("📭 No attendance records found!")
+                return
             
             print("=" * 80)
-            print(f"📈 Total Records: {len(attendance_df)}")
+            print(f"📈 Total Records: {total_records}")
             
             # Show statistics if showing all records
             if date is None:
-                unique_students = len(attendance_df['student_id'].unique())
-                unique_dates = len(attendance_df['date'].unique())
-                print(f"👥 Unique Students: {unique_students}")
-                print(f"📅 Unique Dates: {unique_dates}")
+                print(f"👥 Unique Students: {len(unique_students)}")
+                print(f"📅 Unique Dates: {len(unique_dates)}")
             
         except Exception as e:
             print(f"❌ Error reading attendance: {e}")
@@ -576,22 +1108,24 @@ class WindowsFaceRecognition:
     def show_students_list(self):
         """Display registered students"""
         try:
-            students_df = pd.read_csv(self.students_csv)
+            total_students = 0
+            
+            for student in self.db.iter_students():
+                if total_students == 0:
+                    print("\n👥 Registered Students")
+                    print("=" * 90)
+                    print(f"{'ID':<8} {'Name':<20} {'Email':<30} {'Registration Date':<20}")
+                    print("=" * 90)
+                
+                print(f"{student['student_id']:<8} {student['name']:<20} {student['email']:<30} {student['registration_date']:<20}")
+                total_students += 1
             
-            if students_df.empty:
+            if total_students == 0:
                 print("📭 No students registered!")
                 return
             
-            print("\n👥 Registered Students")
             print("=" * 90)
-            print(f"{'ID':<8} {'Name':<20} {'Email':<30} {'Registration Date':<20}")
-            print("=" * 90)
-            
-            for _, student in students_df.iterrows():
-                print(f"{student['student_id']:<8} {student['name']:<20} {student['email']:<30} {student['registration_date']:<20}")
-            
-            print("=" * 90)
-            print(f"📈 Total Students: {len(students_df)}")
+            print(f"📈 Total Students: {total_students}")
             
         except Exception as e:
             print(f"❌ Error reading students: {e}")
@@ -600,7 +1134,7 @@ class WindowsFaceRecognition:
         """Test camera functionality"""
         print("\n📷 Testing camera...")
         
-        cap = cv2.VideoCapture(0)
+        cap = self.get_camera()
         if not cap.isOpened():
             print("❌ Cannot access camera!")
             print("💡 Troubleshooting tips:")
@@ -612,15 +1146,17 @@ class WindowsFaceRecognition:
         print("✅ Camera is working!")
         print("📋 Press any key to close the test window...")
         
+        # Read frames on a background thread so camera I/O overlaps processing
+        reader = FrameReader(cap)
+        
         while True:
-            ret, frame = cap.read()
+            ret, frame = reader.read()
             if not ret:
-                print("❌ Cannot read from camera!")
+                logger.error("❌ Cannot read from camera!")
                 break
             
             # Add some text to the frame
-            cv2.putText(frame, 'Camera Test - Press any key to exit', (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            self._camera_test_overlay.draw(frame)
             cv2.putText(frame, f'Resolution: {frame.shape[1]}x{frame.shape[0]}', (10, 60), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
             
@@ -629,14 +1165,26 @@ class WindowsFaceRecognition:
             if cv2.waitKey(1) & 0xFF != 255:  # Any key pressed
                 break
         
-        cap.release()
+        reader.stop()
         cv2.destroyAllWindows()
         print("✅ Camera test completed!")
         return True
     
-    def hash_password(self, password):
-        """Create a hash of the password for secure storage"""
-        return hashlib.sha256(password.encode()).hexdigest()
+    def hash_password(self, password, salt=None):
+        """Create a salted scrypt hash of the password for secure storage, as 'salt:hash' in hex"""
+        if salt is None:
+            salt = os.urandom(16)
+        key = hashlib.scrypt(password.encode(), salt=salt, n=2**14, r=8, p=1, dklen=32)
+        return f"{salt.hex()}:{key.hex()}"
+    
+    def check_password(self, password, stored_hash):
+        """Check a password against a stored hash in constant time"""
+        if ':' in stored_hash:
+            salt = bytes.fromhex(stored_hash.split(':', 1)[0])
+            return hmac.compare_digest(self.hash_password(password, salt), stored_hash)
+        
+        # Passwords set before salting was added are a bare SHA-256 hex digest
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored_hash)
     
     def setup_admin_password(self):
         """Setup admin password if it doesn't exist"""
@@ -676,9 +1224,12 @@ class WindowsFaceRecognition:
         
         # Get password from user
         password = getpass.getpass("🔐 Enter admin password: ")
-        entered_hash = self.hash_password(password)
         
-        if entered_hash == stored_hash:
+        if self.check_password(password, stored_hash):
+            # Upgrade a legacy unsalted hash now that the plain password is known
+            if ':' not in stored_hash:
+                with open(self.admin_file, 'w') as f:
+                    f.write(self.hash_password(password))
             print("✅ Admin authentication successful!")
             return True
         else:
@@ -718,15 +1269,15 @@ class WindowsFaceRecognition:
     def check_duplicate_student(self, student_id, name, email):
         """Check if student already exists by ID, name, or email"""
         try:
-            students_df = pd.read_csv(self.students_csv)
+            # Check for duplicate ID (primary key lookup)
+            if self.db.student_exists(int(student_id)):
+                return True, f"Student ID {student_id} already exists!"
+            
+            students_df = self.load_students_df()
             
             if students_df.empty:
                 return False, "No duplicates found"
             
-            # Check for duplicate ID
-            if student_id in students_df['student_id'].values:
-                return True, f"Student ID {student_id} already exists!"
-            
             # Check for duplicate name (case insensitive)
             if name.lower() in students_df['name'].str.lower().values:
                 return True, f"Student name '{name}' already exists!"
@@ -753,18 +1304,21 @@ class WindowsFaceRecognition:
                 return True, "🚨 SECURITY BLOCK: Could not load face image - registration blocked for safety"
             
             # Validate that the new image contains a clear face
-            if not self.validate_face_in_image(temp_face_path):
+            if not self.validate_face_in_image(temp_face_path, new_face):
                 return True, "🚨 SECURITY BLOCK: No clear face detected in image - registration blocked for safety"
             
             # Multiple size analysis for better detection
-            new_face_large = cv2.resize(new_face, (300, 300))
-            new_face_medium = cv2.resize(new_face, (200, 200))
-            new_face_small = cv2.resize(new_face, (100, 100))
+            new_descriptors = self.face_descriptors([new_face])
             
             # Check against existing student faces
             similarity_results = []
             detailed_analysis = []
             
+            # Gather every student's cached descriptors first so they are scored in a few large batches
+            student_ids = []
+            student_descriptors = []
+            existing_students = []  # (student_id, images_checked) in the order of student_descriptors
+            
             for existing_student_folder in os.listdir(self.training_folder):
                 if not existing_student_folder.isdigit():
                     continue
@@ -778,104 +1332,47 @@ class WindowsFaceRecognition:
                     continue
                 
                 print(f"   🔍 DEEP ANALYSIS against Student ID: {existing_student_id}")
+                student_ids.append(existing_student_id)
+            
+            # Students are independent and OpenCV releases the GIL, so load, validate and
+            # describe their images on all cores
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                for existing_student_id, descriptors in zip(student_ids, executor.map(self.build_reference_cache, student_ids)):
+                    if descriptors is not None:
+                        student_descriptors.append(descriptors)
+                        existing_students.append((existing_student_id, len(descriptors['face_300'])))
+            # Written once here, after every worker has finished validating
+            self.save_face_valid_caches()
+            
+            if student_descriptors:
+                # Score all images of all students against the new face, then reduce each
+                # student's contiguous run of scores to its max and mean
+                existing = {key: np.concatenate([descriptors[key] for descriptors in student_descriptors])
+                            for key in DESCRIPTOR_KEYS}
+                batches = [self.face_similarity_scores(new_descriptors, {key: values[i:i + SIMILARITY_BATCH_SIZE]
+                                                                          for key, values in existing.items()})
+                           for i in range(0, len(existing['face_300']), SIMILARITY_BATCH_SIZE)]
+                method_scores = {method: np.concatenate([batch[method] for batch in batches]) for method in batches[0]}
+                combined = method_scores['combined']
                 
-                # Compare with ALL images from existing student (maximum robustness)
-                max_similarity = 0
-                total_similarity = 0
-                images_checked = 0
-                method_scores = []
-                
-                for image_file in os.listdir(folder_path):
-                    if image_file.lower().endswith(('.jpg', '.jpeg', '.png')) and images_checked < 10:
-                        existing_face_path = os.path.join(folder_path, image_file)
-                        
-                        # Validate that the existing image contains a clear face
-                        if not self.validate_face_in_image(existing_face_path):
-                            continue  # Skip invalid images
-                        
-                        existing_face = cv2.imread(existing_face_path, cv2.IMREAD_GRAYSCALE)
-                        
-                        if existing_face is not None:
-                            # Multiple size comparison for robustness
-                            existing_face_large = cv2.resize(existing_face, (300, 300))
-                            existing_face_medium = cv2.resize(existing_face, (200, 200))
-                            existing_face_small = cv2.resize(existing_face, (100, 100))
-                            
-                            # METHOD 1: Multi-scale Template Matching
-                            template_large = cv2.matchTemplate(new_face_large, existing_face_large, cv2.TM_CCOEFF_NORMED).max()
-                            template_medium = cv2.matchTemplate(new_face_medium, existing_face_medium, cv2.TM_CCOEFF_NORMED).max()
-                            template_small = cv2.matchTemplate(new_face_small, existing_face_small, cv2.TM_CCOEFF_NORMED).max()
-                            template_similarity = (template_large + template_medium + template_small) / 3
-                            
-                            # METHOD 2: Multi-scale Histogram Comparison
-                            hist1_large = cv2.calcHist([new_face_large], [0], None, [256], [0, 256])
-                            hist2_large = cv2.calcHist([existing_face_large], [0], None, [256], [0, 256])
-                            hist1_medium = cv2.calcHist([new_face_medium], [0], None, [256], [0, 256])
-                            hist2_medium = cv2.calcHist([existing_face_medium], [0], None, [256], [0, 256])
-                            
-                            hist_correl_large = cv2.compareHist(hist1_large, hist2_large, cv2.HISTCMP_CORREL)
-                            hist_correl_medium = cv2.compareHist(hist1_medium, hist2_medium, cv2.HISTCMP_CORREL)
-                            hist_chi_square_large = 1 / (1 + cv2.compareHist(hist1_large, hist2_large, cv2.HISTCMP_CHISQR))
-                            hist_similarity = (hist_correl_large + hist_correl_medium + hist_chi_square_large) / 3
-                            
-                            # METHOD 3: Enhanced Structural Similarity
-                            mse_large = np.mean((new_face_large.astype("float") - existing_face_large.astype("float")) ** 2)
-                            mse_medium = np.mean((new_face_medium.astype("float") - existing_face_medium.astype("float")) ** 2)
-                            structural_large = 1 / (1 + mse_large / 5000)
-                            structural_medium = 1 / (1 + mse_medium / 5000)
-                            structural_similarity = (structural_large + structural_medium) / 2
-                            
-                            # METHOD 4: Edge Detection Similarity
-                            edges1 = cv2.Canny(new_face_medium, 50, 150)
-                            edges2 = cv2.Canny(existing_face_medium, 50, 150)
-                            edge_mse = np.mean((edges1.astype("float") - edges2.astype("float")) ** 2)
-                            edge_similarity = 1 / (1 + edge_mse / 1000)
-                            
-                            # METHOD 5: Gradient Magnitude Similarity
-                            grad_x1 = cv2.Sobel(new_face_medium, cv2.CV_64F, 1, 0, ksize=3)
-                            grad_y1 = cv2.Sobel(new_face_medium, cv2.CV_64F, 0, 1, ksize=3)
-                            grad_x2 = cv2.Sobel(existing_face_medium, cv2.CV_64F, 1, 0, ksize=3)
-                            grad_y2 = cv2.Sobel(existing_face_medium, cv2.CV_64F, 0, 1, ksize=3)
-                            
-                            grad_mag1 = np.sqrt(grad_x1**2 + grad_y1**2)
-                            grad_mag2 = np.sqrt(grad_x2**2 + grad_y2**2)
-                            grad_mse = np.mean((grad_mag1 - grad_mag2) ** 2)
-                            gradient_similarity = 1 / (1 + grad_mse / 50000)
-                            
-                            # ULTRA-STRICT Combined similarity score with enhanced weighting
-                            combined_similarity = (template_similarity * 0.35 + 
-                                                 hist_similarity * 0.25 + 
-                                                 structural_similarity * 0.20 +
-                                                 edge_similarity * 0.10 +
-                                                 gradient_similarity * 0.10)
-                            
-                            method_scores.append({
-                                'template': template_similarity,
-                                'histogram': hist_similarity, 
-                                'structural': structural_similarity,
-                                'edge': edge_similarity,
-                                'gradient': gradient_similarity,
-                                'combined': combined_similarity
-                            })
-                            
-                            max_similarity = max(max_similarity, combined_similarity)
-                            total_similarity += combined_similarity
-                            images_checked += 1
+                images_checked = np.array([count for _, count in existing_students])
+                starts = np.concatenate(([0], np.cumsum(images_checked)[:-1]))
+                max_similarities = np.maximum(0, np.maximum.reduceat(combined, starts))
+                avg_similarities = np.add.reduceat(combined, starts) / images_checked
+                # Use the MAXIMUM of max similarity and average similarity for ultra-strict checking
+                final_similarities = np.maximum(max_similarities, avg_similarities * 1.1)  # Boost average by 10%
+                last_images = starts + images_checked - 1
                 
-                if images_checked > 0:
-                    avg_similarity = total_similarity / images_checked
-                    # Use the MAXIMUM of max similarity and average similarity for ultra-strict checking
-                    final_similarity = max(max_similarity, avg_similarity * 1.1)  # Boost average by 10%
-                    
-                    if final_similarity > 0:
-                        similarity_results.append((existing_student_id, final_similarity))
+                for i, (existing_student_id, student_images) in enumerate(existing_students):
+                    if final_similarities[i] > 0:
+                        similarity_results.append((existing_student_id, final_similarities[i]))
                         detailed_analysis.append({
                             'student_id': existing_student_id,
-                            'max_similarity': max_similarity,
-                            'avg_similarity': avg_similarity,
-                            'final_similarity': final_similarity,
-                            'images_checked': images_checked,
-                            'method_scores': method_scores[-1] if method_scores else None
+                            'max_similarity': max_similarities[i],
+                            'avg_similarity': avg_similarities[i],
+                            'final_similarity': final_similarities[i],
+                            'images_checked': student_images,
+                            'method_scores': {method: scores[last_images[i]] for method, scores in method_scores.items()}
                         })
             
             # Sort by similarity (highest first)
@@ -897,20 +1394,17 @@ class WindowsFaceRecognition:
                 
                 if top_similarity > ultra_high_similarity_threshold:
                     # ULTRA HIGH SIMILARITY - AUTOMATIC BLOCK
-                    students_df = pd.read_csv(self.students_csv)
-                    existing_name = students_df[students_df['student_id'] == top_match_id]['name'].iloc[0]
+                    existing_name = self.load_student_names()[top_match_id]
                     return True, f"🚨 ULTRA HIGH SIMILARITY DETECTED!\n💀 FRAUD ALERT: Face matches existing student: {existing_name} (ID: {top_match_id})\n📊 Similarity Score: {top_similarity:.1%}\n🚫 Registration AUTOMATICALLY BLOCKED - This appears to be the SAME PERSON!"
                 
                 elif top_similarity > high_similarity_threshold:
                     # HIGH SIMILARITY - AUTOMATIC BLOCK
-                    students_df = pd.read_csv(self.students_csv)
-                    existing_name = students_df[students_df['student_id'] == top_match_id]['name'].iloc[0]
+                    existing_name = self.load_student_names()[top_match_id]
                     return True, f"🚨 HIGH SIMILARITY DETECTED!\n⚠️ Face matches existing student: {existing_name} (ID: {top_match_id})\n📊 Similarity Score: {top_similarity:.1%}\n🚫 Registration BLOCKED for security reasons!"
                 
                 elif top_similarity > medium_similarity_threshold:
                     # MEDIUM SIMILARITY - STRONG WARNING
-                    students_df = pd.read_csv(self.students_csv)
-                    existing_name = students_df[students_df['student_id'] == top_match_id]['name'].iloc[0]
+                    existing_name = self.load_student_names()[top_match_id]
                     return True, f"⚠️ SUSPICIOUS SIMILARITY DETECTED!\n🔍 Face shows similarity to: {existing_name} (ID: {top_match_id})\n📊 Similarity Score: {top_similarity:.1%}\n⚠️ SECURITY REVIEW REQUIRED - Verify this is a different person!"
             
             print("   ✅ Face verification passed - No suspicious similarities detected")
@@ -922,6 +1416,120 @@ class WindowsFaceRecognition:
             # In case of error, fail safely by blocking registration
             return True, f"🚨 SECURITY BLOCK: Face similarity check failed due to technical error.\nRegistration blocked for security reasons.\nError: {str(e)}"
     
+    def face_descriptors(self, faces):
+        """Stack the arrays the similarity methods compare for a list of grayscale faces
+        
+        Returns a dict of (N, ...) arrays: the face resized to 300/200/100, its
+        histograms at 300 and 200, and the Canny edges and gradient magnitude at 200.
+        """
+        descriptors = {f'face_{size}': np.stack([cv2.resize(face, (size, size)) for face in faces])
+                       for size in (300, 200, 100)}
+        descriptors['hist_large'] = np.stack([cv2.calcHist([face], [0], None, [256], [0, 256]).ravel()
+                                              for face in descriptors['face_300']])
+        descriptors['hist_medium'] = np.stack([cv2.calcHist([face], [0], None, [256], [0, 256]).ravel()
+                                               for face in descriptors['face_200']])
+        descriptors['edges_200'] = np.stack([cv2.Canny(face, 50, 150) for face in descriptors['face_200']])
+        descriptors['gradmag_200'] = np.stack([gradient_magnitude(face) for face in descriptors['face_200']])
+        return descriptors
+    
+    def build_reference_cache(self, student_id):
+        """Return the face descriptors of up to 10 valid images of a registered student
+        
+        They are kept in the student's descriptors.npz under CACHE_FOLDER together
+        with the names and mtimes of the folder's images, and only recomputed
+        when those change. Returns None if the student has no valid face image.
+        Only touches this student's files, so several students can be built in
+        parallel; the caller writes the validation results with
+        save_face_valid_caches once they are all done.
+        """
+        folder_path = os.path.join(self.training_folder, str(student_id))
+        image_files = sorted(name for name in os.listdir(folder_path)
+                             if name.lower().endswith(('.jpg', '.jpeg', '.png')))
+        mtimes = np.array([os.path.getmtime(os.path.join(folder_path, name)) for name in image_files])
+        cache_path = os.path.join(self.cache_dir(folder_path), DESCRIPTOR_CACHE_FILE)
+        
+        try:
+            with np.load(cache_path) as cached:
+                if cached['image_files'].tolist() == image_files and np.array_equal(cached['mtimes'], mtimes):
+                    return {key: cached[key] for key in DESCRIPTOR_KEYS}
+        except (OSError, KeyError, ValueError):
+            pass  # No cache yet, or written by an older version
+        
+        # Collect up to 10 valid images from the existing student (maximum robustness)
+        existing_faces = []
+        for image_file in image_files:
+            if len(existing_faces) == 10:
+                break
+            existing_face_path = os.path.join(folder_path, image_file)
+            existing_face = cv2.imread(existing_face_path, cv2.IMREAD_GRAYSCALE)
+            
+            # Validate that the existing image contains a clear face, reusing the decoded image
+            if existing_face is not None and self.validate_face_in_image(existing_face_path, existing_face):
+                existing_faces.append(existing_face)
+        
+        if not existing_faces:
+            return None
+        
+        descriptors = self.face_descriptors(existing_faces)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        np.savez(cache_path, image_files=np.array(image_files, dtype=str), mtimes=mtimes, **descriptors)
+        return descriptors
+    
+    def face_similarity_scores(self, new_face, existing):
+        """Score one face against existing faces with all five similarity methods
+        
+        new_face and existing are face_descriptors dicts, new_face holding a
+        single face. Each method is evaluated for every existing face at once on
+        the stacked arrays, returning a dict of score arrays with one entry per
+        existing face.
+        """
+        # One fused pass per scale gives the template correlation and the pixel MSE together
+        ncc_large, mse_large = pixel_scores(new_face['face_300'][0], existing['face_300'])
+        ncc_medium, mse_medium = pixel_scores(new_face['face_200'][0], existing['face_200'])
+        ncc_small, _ = pixel_scores(new_face['face_100'][0], existing['face_100'])
+        
+        # METHOD 1: Multi-scale Template Matching
+        # For equal-size images TM_CCOEFF_NORMED is the correlation of the mean-centred pixels
+        template_similarity = (ncc_large + ncc_medium + ncc_small) / 3
+        
+        # METHOD 2: Multi-scale Histogram Comparison
+        hist1_large = new_face['hist_large']
+        hist2_large = existing['hist_large']
+        hist_correl_large = unit_centered_rows(hist2_large) @ unit_centered_rows(hist1_large)[0]
+        hist_correl_medium = unit_centered_rows(existing['hist_medium']) @ unit_centered_rows(new_face['hist_medium'])[0]
+        # HISTCMP_CHISQR: sum of (h1 - h2)^2 / h1 over the bins where h1 is non-zero
+        occupied = hist1_large[0] > 0
+        chi_square = (((hist1_large[0, occupied] - hist2_large[:, occupied]) ** 2) / hist1_large[0, occupied]).sum(axis=1)
+        hist_chi_square_large = 1 / (1 + chi_square)
+        hist_similarity = (hist_correl_large + hist_correl_medium + hist_chi_square_large) / 3
+        
+        # METHOD 3: Enhanced Structural Similarity
+        structural_similarity = (1 / (1 + mse_large / 5000) + 1 / (1 + mse_medium / 5000)) / 2
+        
+        # METHOD 4: Edge Detection Similarity
+        _, edge_mse = pixel_scores(new_face['edges_200'][0], existing['edges_200'])
+        edge_similarity = 1 / (1 + edge_mse / 1000)
+        
+        # METHOD 5: Gradient Magnitude Similarity
+        grad_mse = np.mean((new_face['gradmag_200'][0] - existing['gradmag_200']) ** 2, axis=(1, 2))
+        gradient_similarity = 1 / (1 + grad_mse / 50000)
+        
+        # ULTRA-STRICT Combined similarity score with enhanced weighting
+        combined_similarity = (template_similarity * 0.35 + 
+                               hist_similarity * 0.25 + 
+                               structural_similarity * 0.20 +
+                               edge_similarity * 0.10 +
+                               gradient_similarity * 0.10)
+        
+        return {
+            'template': template_similarity,
+            'histogram': hist_similarity,
+            'structural': structural_similarity,
+            'edge': edge_similarity,
+            'gradient': gradient_similarity,
+            'combined': combined_similarity
+        }
+    
     def log_security_event(self, event_type, student_id, details):
         """Log security events for audit trail"""
         try:
@@ -938,8 +1546,9 @@ class WindowsFaceRecognition:
     
     def enhanced_face_capture_with_validation(self, student_id, student_dir, target_images=25):
         """Enhanced face capture with real-time validation"""
-        cap = cv2.VideoCapture(0)
+        cap = self.get_camera()
         count = 0
+        captured_faces = np.empty((target_images, FACE_SIZE, FACE_SIZE), dtype=np.uint8)
         consecutive_faces = 0
         required_consecutive = 3  # Require 3 consecutive clear face detections before allowing capture
         
@@ -955,14 +1564,19 @@ class WindowsFaceRecognition:
             print("❌ Cannot access camera!")
             return False
         
+        # Read frames on a background thread so camera I/O overlaps processing
+        reader = FrameReader(cap)
+        
         while count < target_images:
-            ret, frame = cap.read()
+            ret, frame = reader.read()
             if not ret:
-                print("❌ Cannot read from camera!")
+                logger.error("❌ Cannot read from camera!")
                 break
             
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=6, minSize=(120, 120))
+            # Detect on a half-resolution copy (320 wide for the 640x480 camera); the
+            # full-resolution gray frame is only downloaded for the saved crop
+            gray = self.to_detection_gray(frame)
+            faces = self.detect_faces_half_res(gray, 1.2, 6, (120, 120))
             
             # Enhanced face validation
             valid_faces = []
@@ -990,21 +1604,17 @@ class WindowsFaceRecognition:
                     cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 0, 255), 2)
                 
                 if len(faces) == 0:
-                    cv2.putText(frame, 'No Face Detected', (10, 150), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+                    self._no_valid_face_overlay.draw(frame)
                 elif len(faces) > 1:
-                    cv2.putText(frame, 'Multiple Faces - Please ensure only one person', (10, 150), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+                    self._multiple_faces_overlay.draw(frame)
             
             # Display capture status
             cv2.putText(frame, f'Images Captured: {count}/{target_images}', (10, 30), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-            cv2.putText(frame, 'SPACEBAR: Capture | ESC: Cancel', (10, 70), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            self._capture_keys_overlay.draw(frame)
             
             if consecutive_faces >= required_consecutive:
-                cv2.putText(frame, 'READY TO CAPTURE - Press SPACEBAR', (10, 110), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                self._ready_to_capture_overlay.draw(frame)
             else:
                 cv2.putText(frame, f'Face validation: {consecutive_faces}/{required_consecutive}', (10, 110), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
@@ -1017,38 +1627,38 @@ class WindowsFaceRecognition:
                     x, y, w, h = valid_faces[0]
                     
                     # Extract and enhance face
-                    face_img = gray[y:y+h, x:x+w]
+                    face_img = self.download_gray(gray)[y:y+h, x:x+w]
                     
                     # Enhance image quality
                     face_img = cv2.equalizeHist(face_img)  # Improve contrast
-                    face_img = cv2.resize(face_img, (200, 200))
+                    face_img = cv2.resize(face_img, (FACE_SIZE, FACE_SIZE))
                     
-                    # Save with high quality
-                    filename = os.path.join(student_dir, f'{student_id}_{count:03d}.jpg')
-                    cv2.imwrite(filename, face_img, [cv2.IMWRITE_JPEG_QUALITY, 95])
+                    captured_faces[count] = face_img
                     count += 1
                     
-                    print(f"📸 High-quality image {count}/{target_images} captured and validated")
+                    logger.debug(f"📸 High-quality image {count}/{target_images} captured and validated")
                     consecutive_faces = 0  # Reset for next capture
                     
                     cv2.waitKey(300)  # Brief pause
                 else:
                     if len(valid_faces) == 0:
-                        print("⚠️ No valid face detected! Please position your face properly.")
+                        logger.info("⚠️ No valid face detected! Please position your face properly.")
                     elif len(valid_faces) > 1:
-                        print("⚠️ Multiple faces detected! Please ensure only one person is in frame.")
+                        logger.info("⚠️ Multiple faces detected! Please ensure only one person is in frame.")
                     else:
-                        print(f"⚠️ Face validation incomplete ({consecutive_faces}/{required_consecutive}). Keep face steady.")
+                        logger.info(f"⚠️ Face validation incomplete ({consecutive_faces}/{required_consecutive}). Keep face steady.")
                         
             elif key == 27:  # ESC
                 print("❌ Capture cancelled by user")
                 break
         
-        cap.release()
+        reader.stop()
         cv2.destroyAllWindows()
         
         success = count >= 15
         if success:
+            # Save with high quality
+            self.save_captured_faces(student_id, student_dir, captured_faces[:count], [cv2.IMWRITE_JPEG_QUALITY, 95])
             print(f"✅ Successfully captured {count} high-quality, validated images!")
             self.log_security_event("FACE_CAPTURE_SUCCESS", student_id, f"Captured {count} validated images")
         else:
@@ -1057,26 +1667,75 @@ class WindowsFaceRecognition:
         
         return success
     
-    def validate_face_in_image(self, image_path):
-        """Validate that the image contains a clear, detectable face"""
+    def validate_face_in_image(self, image_path, image=None):
+        """Validate that the image contains a clear, detectable face
+        
+        Results are remembered per folder and written to its valid.json by
+        save_face_valid_caches, so an unchanged image is only run through the
+        cascade once. Callers that already read the image pass it as a
+        grayscale array to skip reading it again.
+        """
         try:
-            image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            folder_path, image_file = os.path.split(image_path)
+            mtime = os.path.getmtime(image_path)
+            folder_cache = self.load_face_valid_cache(folder_path)
+            with self._face_valid_lock:
+                cached = folder_cache.get(image_file)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+            
+            is_valid = False
             if image is None:
-                return False
-            
-            # Detect faces in the image
-            faces = self.face_cascade.detectMultiScale(image, 1.3, 5)
-            
-            # Must contain exactly one face and it should be reasonably sized
-            if len(faces) == 1:
-                x, y, w, h = faces[0]
-                # Face should be at least 50x50 pixels
-                if w >= 50 and h >= 50:
-                    return True
-            
-            return False
+                image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            if image is not None:
+                # Detect faces in the image
+                faces = self.thread_face_cascade().detectMultiScale(image, 1.3, 5)
+                
+                # Must contain exactly one face and it should be reasonably sized
+                if len(faces) == 1:
+                    x, y, w, h = faces[0]
+                    # Face should be at least 50x50 pixels
+                    is_valid = bool(w >= 50 and h >= 50)
+            
+            with self._face_valid_lock:
+                folder_cache[image_file] = [mtime, is_valid]
+                self._face_valid_dirty.add(folder_path)
+            return is_valid
         except:
             return False
+    
+    def load_face_valid_cache(self, folder_path):
+        """Return the validation results recorded for a folder, reading its valid.json the first time"""
+        with self._face_valid_lock:
+            folder_cache = self._face_valid_cache.get(folder_path)
+            if folder_cache is None:
+                try:
+                    with open(os.path.join(self.cache_dir(folder_path), FACE_VALIDATION_CACHE_FILE), 'r') as f:
+                        folder_cache = json.load(f)
+                except (OSError, ValueError):
+                    folder_cache = {}
+                self._face_valid_cache[folder_path] = folder_cache
+            return folder_cache
+    
+    def save_face_valid_caches(self):
+        """Write the valid.json of every folder with new results, atomically so a crash never leaves one half written"""
+        # Held throughout so no folder's results change while they are being serialised
+        with self._face_valid_lock:
+            for folder_path in self._face_valid_dirty:
+                cache_path = os.path.join(self.cache_dir(folder_path), FACE_VALIDATION_CACHE_FILE)
+                temp_path = cache_path + '.tmp'
+                try:
+                    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                    with open(temp_path, 'w') as f:
+                        json.dump(self._face_valid_cache[folder_path], f)
+                    os.replace(temp_path, cache_path)
+                except OSError:
+                    pass  # Only the cache is lost; the results are recomputed next time
+            self._face_valid_dirty.clear()
+    
+    def cache_dir(self, folder_path):
+        """Directory under CACHE_FOLDER holding the derived caches of an image folder"""
+        return os.path.join(CACHE_FOLDER, os.path.basename(os.path.normpath(folder_path)))
 
     def test_face_similarity_security(self):
         """Test function to demonstrate the ultra-strict face similarity detection"""
@@ -1104,7 +1763,7 @@ class WindowsFaceRecognition:
         
         # Load the trained model
         try:
-            self.recognizer.read(self.model_file)
+            self.load_model()
             if status_callback:
                 status_callback("✅ Model loaded successfully", "success")
         except Exception as e:
@@ -1114,7 +1773,7 @@ class WindowsFaceRecognition:
         
         # Load student data
         try:
-            students_df = pd.read_csv(self.students_csv)
+            students_df = self.load_students_df()
             if students_df.empty:
                 if status_callback:
                     status_callback("❌ No students registered!", "error")
@@ -1212,6 +1871,7 @@ def main():
                 system.update_admin_password()
             
             elif choice == '8':
+                system.close()
                 print("👋 Thank you for using Face Recognition Attendance System!")
                 print("🎯 Have a great day!")
                 break
@@ -1220,6 +1880,7 @@ def main():
                 print("❌ Invalid choice! Please select 1-8.")
                 
         except KeyboardInterrupt:
+            system.close()
             print("\n\n👋 Goodbye!")
             break
         except Exception as e:
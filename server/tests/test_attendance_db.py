@@ -0,0 +1,98 @@
+import pytest
+
+from attendance_db import ATTENDANCE_COLUMNS, STUDENT_COLUMNS, AttendanceDatabase
+
+
+@pytest.fixture
+def paths(tmp_path):
+    students_csv = tmp_path / "students.csv"
+    attendance_csv = tmp_path / "attendance.csv"
+    students_csv.write_text(",".join(STUDENT_COLUMNS) + "\n1,Ada,ada@example.com,2024-01-01 09:00:00\n")
+    attendance_csv.write_text(",".join(ATTENDANCE_COLUMNS) + "\n")
+    return str(tmp_path / "attendance.db"), str(students_csv), str(attendance_csv)
+
+
+@pytest.fixture
+def db(paths):
+    database = AttendanceDatabase(*paths)
+    yield database
+    database.close()
+
+
+def test_existing_csv_rows_are_imported(db):
+    assert db.get_student_ids() == {1}
+
+
+def test_rows_appended_by_another_writer_are_synced(db, paths):
+    _, students_csv, attendance_csv = paths
+    with open(students_csv, "a") as f:
+        f.write("2,Grace,grace@example.com,2024-01-02 09:00:00\n")
+    with open(attendance_csv, "a") as f:
+        f.write("2,Grace,2024-01-02,09:05:00,Present\n")
+
+    assert db.get_student_ids() == {1, 2}
+    assert [record["student_id"] for record in db.get_attendance("2024-01-02")] == [2]
+
+
+def test_add_student_appends_to_csv_and_rejects_duplicates(db, paths):
+    _, students_csv, _ = paths
+    assert db.add_student(2, "Grace", "grace@example.com", "2024-01-02 09:00:00")
+    assert not db.add_student(1, "Ada", "ada@example.com", "2024-01-02 09:00:00")
+
+    with open(students_csv) as f:
+        assert f.read().splitlines()[-1] == "2,Grace,grace@example.com,2024-01-02 09:00:00"
+    assert db.student_exists(2)
+
+
+def test_duplicate_attendance_is_rejected(db, paths):
+    _, _, attendance_csv = paths
+    assert db.add_attendance(1, "Ada", "2024-01-02", "09:00:00")
+    assert not db.add_attendance(1, "Ada", "2024-01-02", "10:00:00")
+    assert db.add_attendance(1, "Ada", "2024-01-03", "09:00:00")
+
+    with open(attendance_csv) as f:
+        assert len(f.read().splitlines()) == 3  # header + two days
+
+
+def test_duplicate_written_by_another_writer_is_seen(db, paths):
+    _, _, attendance_csv = paths
+    with open(attendance_csv, "a") as f:
+        f.write("1,Ada,2024-01-02,08:00:00,Present\n")
+
+    assert not db.add_attendance(1, "Ada", "2024-01-02", "09:00:00")
+
+
+def test_trailing_partial_line_waits_for_its_newline(db, paths):
+    _, _, attendance_csv = paths
+    with open(attendance_csv, "a") as f:
+        f.write("1,Ada,2024-01-02,08:0")
+    assert db.get_attendance() == []
+
+    with open(attendance_csv, "a") as f:
+        f.write("0:00,Present\n")
+    assert db.get_attendance() == [
+        {"student_id": 1, "name": "Ada", "date": "2024-01-02", "time": "08:00:00", "status": "Present"}]
+
+
+def test_truncated_csv_is_reimported(db, paths):
+    _, students_csv, _ = paths
+    assert db.add_student(2, "Grace", "grace@example.com", "2024-01-02 09:00:00")
+
+    with open(students_csv, "w") as f:
+        f.write(",".join(STUDENT_COLUMNS) + "\n3,Alan,alan@example.com,2024-01-03 09:00:00\n")
+
+    assert db.get_student_ids() == {3}
+
+
+def test_new_database_catches_up_with_existing_one(paths):
+    db_path, students_csv, attendance_csv = paths
+    first = AttendanceDatabase(db_path, students_csv, attendance_csv)
+    first.add_attendance(1, "Ada", "2024-01-02", "09:00:00")
+    first.close()
+
+    second = AttendanceDatabase(db_path, students_csv, attendance_csv)
+    try:
+        assert len(second.get_attendance()) == 1
+        assert not second.add_attendance(1, "Ada", "2024-01-02", "10:00:00")
+    finally:
+        second.close()
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("face_recognition")
+import advanced_face_recognition
+from advanced_face_recognition import AdvancedFaceRecognition
+
+
+def make_matcher(gallery):
+    # Skip __init__: it opens the database and warms up the dlib models
+    matcher = AdvancedFaceRecognition.__new__(AdvancedFaceRecognition)
+    matcher.known_face_encodings = list(gallery)
+    matcher._rebuild_known_matrix()
+    return matcher
+
+
+@pytest.fixture
+def gallery_and_probes():
+    rng = np.random.default_rng(0)
+    gallery = rng.normal(scale=0.1, size=(300, 128)).astype(np.float32)
+    expected = np.array([5, 120, 299, 42])
+    probes = gallery[expected] + rng.normal(scale=0.005, size=(len(expected), 128)).astype(np.float32)
+    distances = np.linalg.norm(gallery[None, :, :] - probes[:, None, :], axis=2)
+    return gallery, probes, distances.argmin(axis=1), distances.min(axis=1)
+
+
+def test_gemm_path_matches_brute_force(gallery_and_probes, monkeypatch):
+    gallery, probes, expected_indices, expected_distances = gallery_and_probes
+    monkeypatch.setattr(advanced_face_recognition, "faiss", None)
+    indices, distances = make_matcher(gallery)._match_encodings(probes)
+
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(distances, expected_distances, atol=1e-4)
+
+
+def test_numba_path_matches_brute_force(gallery_and_probes, monkeypatch):
+    if advanced_face_recognition.numba is None:
+        pytest.skip("numba is not installed")
+    gallery, probes, expected_indices, expected_distances = gallery_and_probes
+    monkeypatch.setattr(advanced_face_recognition, "faiss", None)
+    matcher = make_matcher(gallery)
+
+    # A single probe takes the numba scan
+    for probe, expected_index, expected_distance in zip(probes, expected_indices, expected_distances):
+        indices, distances = matcher._match_encodings([probe])
+        assert indices[0] == expected_index
+        assert distances[0] == pytest.approx(expected_distance, abs=1e-4)
+
+
+def test_faiss_path_matches_brute_force(gallery_and_probes, monkeypatch):
+    if advanced_face_recognition.faiss is None:
+        pytest.skip("faiss is not installed")
+    gallery, probes, expected_indices, expected_distances = gallery_and_probes
+    monkeypatch.setattr(advanced_face_recognition, "FAISS_MIN_GALLERY", len(gallery))
+    matcher = make_matcher(gallery)
+    assert matcher._faiss_index is not None
+
+    indices, distances = matcher._match_encodings(probes)
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(distances, expected_distances, atol=1e-4)
@@ -1144,30 +1144,37 @@ Technical Details:
         """Run the attendance camera using main system logic"""
         try:
             # Load students data using main system
-            students_df = pd.read_csv(self.face_system.students_csv)
+            id_to_name = self.face_system.load_student_names()
             
-            # Initialize camera
-            cap = cv2.VideoCapture(0)
+            # Use the main system's shared camera
+            cap = self.face_system.get_camera()
             if not cap.isOpened():
                 self.root.after(0, lambda: self.attendance_status.set_status("❌ Cannot access camera!", "error"))
                 return
             
             self.root.after(0, lambda: self.attendance_status.set_status("📷 Camera started! Position face clearly. Attendance marked automatically.", "success"))
             
-            marked_today = set()
+            # Start from today's existing records so earlier sessions' marks show as already marked
+            today = datetime.now().strftime('%Y-%m-%d')
+            marked_today = self.face_system.load_marked_today(today)
             recognition_frames = 0
             required_frames = 5  # Consecutive frames for recognition
             last_recognized = None
-            confidence_threshold = 70
+            confidence_threshold = self.face_system.confidence_threshold
+            # Every face is resized and equalized into this one chip
+            face_chip = np.empty((200, 200), dtype=np.uint8)
             
             while self.camera_active:
                 ret, frame = cap.read()
                 if not ret:
                     break
                 
-                # Convert to grayscale for face detection
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = self.face_system.face_cascade.detectMultiScale(gray, scaleFactor=1.3, minNeighbors=5, minSize=(100, 100))
+                # Convert to grayscale for face detection into the system's reused buffer;
+                # detect at half resolution, crop at full
+                gray = self.face_system.to_detection_gray(frame)
+                faces = self.face_system.detect_faces_half_res(gray, 1.3, 5, (100, 100))
+                if len(faces) > 0:
+                    gray = self.face_system.download_gray(gray)
                 
                 current_recognition = None
                 
@@ -1176,18 +1183,17 @@ Technical Details:
                     cv2.rectangle(frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
                     
                     # Extract and resize face
-                    face_region = gray[y:y+h, x:x+w]
-                    face_region = cv2.resize(face_region, (200, 200))
+                    cv2.resize(gray[y:y+h, x:x+w], (200, 200), dst=face_chip)
+                    cv2.equalizeHist(face_chip, dst=face_chip)
                     
                     # Recognize face using main system's recognizer
-                    student_id, confidence = self.face_system.recognizer.predict(face_region)
+                    student_id, confidence = self.face_system.predict_faces([face_chip])[0]
                     
                     # Check if recognition is confident enough
                     if confidence <= confidence_threshold:
                         # Find student info
-                        student_info = students_df[students_df['student_id'] == student_id]
-                        if not student_info.empty:
-                            name = student_info.iloc[0]['name']
+                        name = id_to_name.get(student_id)
+                        if name is not None:
                             accuracy = round(100 - confidence, 1)
                             
                             # Display recognition info
@@ -1231,7 +1237,8 @@ Technical Details:
                                 # Update today's attendance list
                                 self.root.after(0, self.update_today_attendance)
                             else:
-                                # Student already marked today
+                                # Student already marked today, e.g. by another session
+                                marked_today.update(self.face_system.load_marked_today(today))
                                 self.root.after(0, lambda n=name: 
                                     self.attendance_status.set_status(f"ℹ️ {n} already marked today", "warning"))
                             recognition_frames = 0
@@ -1256,7 +1263,6 @@ Technical Details:
                 if key == ord('q') or key == ord('Q') or not self.camera_active:
                     break
             
-            cap.release()
             cv2.destroyAllWindows()
             
             # Update final status
@@ -1425,8 +1431,8 @@ Technical Details:
         
         def run_test():
             try:
-                # Open the default camera
-                cap = cv2.VideoCapture(0)
+                # Open the default camera, shared with the main system once it is initialized
+                cap = self.face_system.get_camera() if self.face_system else cv2.VideoCapture(0)
                 
                 if not cap.isOpened():
                     raise Exception("Could not open camera")
@@ -1448,7 +1454,8 @@ Technical Details:
                     if key == ord('q'):  # 'q' key to quit
                         break
                 
-                cap.release()
+                if not self.face_system:
+                    cap.release()
                 cv2.destroyAllWindows()
                 
                 self.camera_test_status.set_status("Camera test stopped", "info")
@@ -1571,6 +1578,9 @@ def run_gui():
     """Run the Tkinter GUI"""
     gui = FaceRecognitionGUI()
     gui.root.mainloop()
+    
+    if gui.face_system:
+        gui.face_system.close()
 
 if __name__ == "__main__":
     run_gui()
@@ -15,7 +15,10 @@ class AttendanceUtils:
     def test_camera():
         """Test if camera is working properly"""
         print("Testing camera...")
-        cap = cv2.VideoCapture(0)
+        cap = cv2.VideoCapture(0, cv2.CAP_DSHOW) if os.name == 'nt' else cv2.VideoCapture(0)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        cap.set(cv2.CAP_PROP_FPS, 30)
         
         if not cap.isOpened():
             print("❌ Cannot access camera!")
@@ -93,8 +96,9 @@ class AttendanceUtils:
             student_attendance = attendance_df.groupby('student_id').size().sort_values(ascending=False)
             
             print(f"\n🏆 Top Attendees:")
+            id_to_name = dict(zip(students_df['student_id'], students_df['name']))
             for student_id, count in student_attendance.head(5).items():
-                student_name = students_df[students_df['student_id'] == student_id]['name'].iloc[0]
+                student_name = id_to_name.get(student_id, 'Unknown')
                 print(f"   {student_name} (ID: {student_id}): {count} days")
             
             # Recent activity